@@ -0,0 +1,149 @@
+"""
+Measure the memory used per parsed lease with tracemalloc, for the lease classes and for a reference
+with the dict based lease classes that were used before they got __slots__ and shared strings.
+
+Usage: python benchmarks/bench_memory.py [size in MB]
+"""
+from __future__ import print_function
+
+import codecs
+import datetime
+import os
+import struct
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, utc
+from bench_parser import build_lease_file, regex_leaseblock, regex_leaseblock6, regex_iaaddr
+
+
+def reference_time(s):
+    """
+    parse_time() without its cache, every lease gets its own datetime objects
+    """
+    if "epoch" in s:
+        return datetime.datetime.utcfromtimestamp(float(s.rstrip().split(' ')[1][:-1])).replace(tzinfo=utc)
+    _, date_part, time_part = s.split(' ')
+    year, mon, day = date_part.split('/')
+    hour, minute, sec = time_part.split(':')
+    return datetime.datetime(*map(int, (year, mon, day, hour, minute, sec))).replace(tzinfo=utc)
+
+
+def reference_properties(config):
+    """
+    _extract_properties() without the shared key and value strings
+    """
+    general, options, sets = {}, {}, {}
+    for line in config.splitlines():
+        if not line or not line[-1:] == ';' and '; #' not in line:
+            continue
+        line = line[:-1].lstrip()
+        if line[:6] == 'option':
+            key, _, value = line[7:].partition(' ')
+            options[key] = value
+        elif line[:3] == 'set':
+            key, _, value = line[4:].partition(' = "')
+            sets[key] = value[:-1]
+        else:
+            key, _, value = line.partition(' ')
+            general[key] = value
+    return general, options, sets
+
+
+class ReferenceLease(object):
+    """
+    IPv4 lease with a per-instance __dict__ like Lease before __slots__
+    """
+
+    def __init__(self, ip, properties, options, sets):
+        self.ip = ip
+        self.data = properties
+        self.options = options
+        self.sets = sets
+        _, self.binding_state = properties['binding'].split(' ', 1)
+        self._now = None
+        self.start = reference_time(properties['starts']) if 'starts' in properties else None
+        ends = properties.get('ends', 'never')
+        self.end = None if ends == 'never' else reference_time(ends)
+        self._hardware = properties['hardware'].split(' ')
+        self.hardware, self.ethernet = self._hardware
+        self.hostname = properties.get('client-hostname', '').replace("\"", "")
+
+
+class ReferenceLease6(object):
+    """
+    IPv6 lease with a per-instance __dict__ like Lease6 before __slots__
+    """
+
+    def __init__(self, ip, properties, options, sets, cltt, host_identifier, address_type):
+        self.ip = ip
+        self.data = properties
+        self.options = options
+        self.sets = sets
+        _, self.binding_state = properties['binding'].split(' ', 1)
+        self._now = None
+        self.type = address_type
+        self.last_communication = cltt
+        self.host_identifier = codecs.decode(host_identifier, 'unicode_escape').encode('latin-1')
+        self.iaid = struct.unpack('<I', self.host_identifier[0:4])[0]
+        self.duid = self.host_identifier[4:]
+        ends = properties.get('ends', 'never')
+        self.end = None if ends == 'never' else reference_time(ends)
+        self.preferred_life = int(properties['preferred-life'])
+        self.max_life = int(properties['max-life'])
+
+
+def reference_get(filename):
+    """
+    IscDhcpLeases.get() with the reference lease classes, the blocks are found like regex_get() does
+    """
+    leases = []
+    with open(filename) as lease_file:
+        lease_data = lease_file.read()
+    for match in regex_leaseblock.finditer(lease_data):
+        block = match.groupdict()
+        properties, options, sets = reference_properties(block['config'])
+        if 'hardware' in properties:
+            leases.append(ReferenceLease(block['ip'], properties, options, sets))
+
+    for match in regex_leaseblock6.finditer(lease_data):
+        block = match.groupdict()
+        properties, _, _ = reference_properties(block['config'])
+        cltt = reference_time(properties['cltt'])
+        for address_block in regex_iaaddr.finditer(block['config']):
+            address = address_block.groupdict()
+            properties, options, sets = reference_properties(address['config'])
+            leases.append(ReferenceLease6(address['ip'], properties, options, sets, cltt, block['id'],
+                                          block['type']))
+    return leases
+
+
+def measure(get):
+    """
+    :return: tuple of the number of leases and the bytes allocated for them
+    """
+    tracemalloc.start()
+    result = get()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(result), size
+
+
+def main():
+    size = int(float(sys.argv[1]) * 1024 * 1024) if len(sys.argv) > 1 else 5 * 1024 * 1024
+    filename = build_lease_file(size)
+    try:
+        for name, get in [('reference', lambda: reference_get(filename)),
+                          ('eager', IscDhcpLeases(filename).get),
+                          ('lazy', IscDhcpLeases(filename, lazy=True).get)]:
+            count, allocated = measure(get)
+            print('{:<10} {:8d} leases {:10.1f} KB {:8.0f} bytes/lease'.format(
+                name, count, allocated / 1024.0, allocated / float(count)))
+    finally:
+        os.unlink(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Compare parse_time_epoch() with datetime.strptime for the times in a lease block, with and without
+its cache.
+
+Usage: python benchmarks/bench_parse_time.py [number]
+"""
+from __future__ import print_function
+
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from isc_dhcp_leases.iscdhcpleases import parse_time_epoch, _epoch_cache
+
+VALUE = '2 2013/12/10 12:57:04'
+
+
+def uncached():
+    _epoch_cache.clear()
+    parse_time_epoch(VALUE)
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    timers = [('strptime', lambda: datetime.datetime.strptime(VALUE, "%w %Y/%m/%d %H:%M:%S")),
+               ('parse_time_epoch uncached', uncached),
+               ('parse_time_epoch cached', lambda: parse_time_epoch(VALUE))]
+    for name, func in timers:
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print('{:<28} {:8.3f} us/call'.format(name, seconds / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
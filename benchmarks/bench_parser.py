@@ -0,0 +1,99 @@
+"""
+Compare the parse throughput of the single-pass block tokenizer with the regular expressions
+that were used before it.
+
+Usage: python benchmarks/bench_parser.py [size in MB]
+"""
+from __future__ import print_function
+
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, Lease, Lease6, _extract_properties, parse_time
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'isc_dhcp_leases', 'test_files')
+FIXTURES = ['debian7.leases', 'pfsense.leases', 'options.leases', 'dhcpd6-4.2.4.leases', 'dhcpd6-4.3.3.leases']
+
+regex_leaseblock = re.compile(r"lease (?P<ip>\d+\.\d+\.\d+\.\d+) {(?P<config>[\s\S]+?)\n}")
+regex_leaseblock6 = re.compile(
+    r"ia-(?P<type>ta|na|pd) \"(?P<id>[^\"\\]*(?:\\.[^\"\\]*)*)\" {(?P<config>[\s\S]+?)\n}")
+regex_iaaddr = re.compile(r"ia(addr|prefix) (?P<ip>[0-9a-f:]+(/[0-9]+)?) {(?P<config>[\s\S]+?)\n\s+}")
+
+
+def regex_get(filename):
+    """
+    The regular expression based parser as IscDhcpLeases.get() implemented it before the tokenizer
+    """
+    leases = []
+    with open(filename) as lease_file:
+        lease_data = lease_file.read()
+    for match in regex_leaseblock.finditer(lease_data):
+        block = match.groupdict()
+        properties, options, sets = _extract_properties(block['config'])
+        if 'hardware' not in properties:
+            continue
+        leases.append(Lease(block['ip'], properties=properties, options=options, sets=sets))
+
+    for match in regex_leaseblock6.finditer(lease_data):
+        block = match.groupdict()
+        properties, options, sets = _extract_properties(block['config'])
+        host_identifier = block['id']
+        block_type = block['type']
+        last_client_communication = parse_time(properties['cltt'])
+        for address_block in regex_iaaddr.finditer(block['config']):
+            block = address_block.groupdict()
+            properties, options, sets = _extract_properties(block['config'])
+            leases.append(Lease6(block['ip'], properties, last_client_communication, host_identifier, block_type,
+                                 options=options, sets=sets))
+    return leases
+
+
+def build_lease_file(size):
+    """
+    Write the bundled test files repeatedly to a temporary file until it's at least size bytes
+    """
+    blocks = []
+    for name in FIXTURES:
+        with open(os.path.join(TEST_FILES, name)) as fixture:
+            blocks.append(fixture.read().rstrip() + '\n')
+    data = ''.join(blocks)
+
+    handle, filename = tempfile.mkstemp(suffix='.leases')
+    with os.fdopen(handle, 'w') as lease_file:
+        for _ in range(size // len(data) + 1):
+            lease_file.write(data)
+    return filename
+
+
+def bench(name, func, size, repeat=3):
+    seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+    print('{:<12} {:8.3f} s {:8.2f} MB/s'.format(name, seconds, size / seconds / 1024 / 1024))
+
+
+def main():
+    size = int(float(sys.argv[1]) * 1024 * 1024) if len(sys.argv) > 1 else 20 * 1024 * 1024
+    filename = build_lease_file(size)
+    try:
+        size = os.path.getsize(filename)
+        leases = IscDhcpLeases(filename)
+        assert len(leases.get()) == len(regex_get(filename))
+        print('Parsing {:.1f} MB'.format(size / 1024.0 / 1024))
+        bench('regex', lambda: regex_get(filename), size)
+        bench('tokenizer', leases.get, size)
+        lazy_leases = IscDhcpLeases(filename, lazy=True)
+        bench('lazy', lambda: [(lease.ip, lease.binding_state) for lease in lazy_leases.get()], size)
+        workers = multiprocessing.cpu_count()
+        if workers > 1:
+            bench('{} workers'.format(workers), IscDhcpLeases(filename, workers=workers).get, size)
+    finally:
+        os.unlink(filename)
+
+
+if __name__ == '__main__':
+    main()
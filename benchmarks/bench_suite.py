@@ -0,0 +1,115 @@
+"""
+Measure the parse throughput, peak memory and per-lease latency of get(), get_current() and lease
+attribute access on a synthetic lease file from generate_leases.py, for every parse mode.
+
+Usage: python benchmarks/bench_suite.py [--leases N] [--ipv6 FRACTION] [--renewals N] [--epoch] [--gzip]
+                                        [--repeat N]
+"""
+from __future__ import print_function
+
+import argparse
+import datetime
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, Lease6, utc
+from generate_leases import NOW, generate_file
+
+MODES = [('eager', {}), ('lazy', {'lazy': True}), ('incremental', {'incremental': True})]
+
+ATTRIBUTES = ['ip', 'binding_state', 'end', 'valid', 'active', 'options', 'sets']
+ATTRIBUTES4 = ATTRIBUTES + ['ethernet', 'hostname', 'start']
+ATTRIBUTES6 = ATTRIBUTES + ['host_identifier_string', 'last_communication', 'preferred_life']
+
+
+def access(leases):
+    for lease in leases:
+        for name in ATTRIBUTES6 if isinstance(lease, Lease6) else ATTRIBUTES4:
+            getattr(lease, name)
+
+
+def peak_memory(func):
+    """
+    :return: the peak number of bytes allocated while running func or None without tracemalloc
+    """
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def report(name, seconds, count, size=None, peak=None):
+    throughput = '{:8.2f} MB/s'.format(size / seconds / 1024 / 1024) if size is not None else '{:>13}'.format('-')
+    memory = '{:8.1f} MB'.format(peak / 1024.0 / 1024) if peak is not None else '{:>11}'.format('-')
+    print('{:<28} {:8.3f} s {} {:8.2f} us/lease {}'.format(name, seconds, throughput, seconds / count * 1e6,
+                                                          memory))
+
+
+def bench(filename, size, repeat):
+    now = datetime.datetime.utcfromtimestamp(NOW).replace(tzinfo=utc)
+    for mode, kwargs in MODES:
+        def get():
+            # A new instance for every run, otherwise incremental mode only parses the file once
+            return IscDhcpLeases(filename, now=now, **kwargs).get(include_backups=True)
+
+        def get_current():
+            return IscDhcpLeases(filename, now=now, **kwargs).get_current()
+
+        count = len(get())
+        report('{} get()'.format(mode), min(timeit.repeat(get, number=1, repeat=repeat)), count, size,
+               peak_memory(get))
+        report('{} get_current()'.format(mode), min(timeit.repeat(get_current, number=1, repeat=repeat)),
+               count, size, peak_memory(get_current))
+
+        # Access the attributes of fresh objects, the lazy leases parse their fields on first access
+        seconds = []
+        for _ in range(repeat):
+            leases = get()
+            seconds.append(timeit.timeit(lambda: access(leases), number=1))
+        report('{} attributes'.format(mode), min(seconds), count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('--leases', type=int, default=50000, help='number of addresses')
+    parser.add_argument('--ipv6', type=float, default=0.2, help='fraction of IPv6 leases')
+    parser.add_argument('--renewals', type=int, default=3, help='maximum number of renewals per address')
+    parser.add_argument('--epoch', action='store_true', help='write the times as seconds since the epoch')
+    parser.add_argument('--gzip', action='store_true', help='compress the lease file')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs, the fastest run is reported')
+    args = parser.parse_args()
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tempdir, 'dhcpd.leases.gz' if args.gzip else 'dhcpd.leases')
+        blocks = generate_file(filename, args.gzip, leases=args.leases, ipv6=args.ipv6, renewals=args.renewals,
+                               epoch=args.epoch)
+        if args.gzip:
+            # The throughput is reported for the uncompressed lease data
+            with gzip.open(filename, 'rb') as lease_file:
+                size = len(lease_file.read())
+        else:
+            size = os.path.getsize(filename)
+        print('{} blocks for {} addresses, {:.1f} MB'.format(blocks, args.leases, size / 1024.0 / 1024))
+        bench(filename, size, args.repeat)
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
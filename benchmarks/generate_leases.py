@@ -0,0 +1,183 @@
+"""
+Generate a synthetic lease file that looks like a dhcpd journal: IPv4 and IPv6 leases that are
+renewed several times, relay agent options, set statements, failover backup leases and optionally
+epoch times and gzip compression. The output only depends on the seed.
+
+Usage: python benchmarks/generate_leases.py output.leases [--leases N] [--ipv6 FRACTION] [--renewals N]
+                                             [--backups FRACTION] [--epoch] [--gzip] [--seed N]
+"""
+from __future__ import print_function
+
+import argparse
+import gzip
+import random
+import time
+
+# Jul 6 2015, the blocks are written during the following two days
+START = 1436140800
+# Time at which part of the leases are still valid
+NOW = START + 86400
+
+_vendors = ['MSFT 5.0', 'android-dhcp-9', 'udhcp 1.28.4', 'dhcpcd-8.1.2:Linux-5.4.0:x86_64:GenuineIntel']
+
+
+def _time(seconds, epoch):
+    if epoch:
+        return 'epoch {}; # {}'.format(seconds, time.strftime('%a %b %d %H:%M:%S %Y', time.gmtime(seconds)))
+    # dhcpd numbers the weekdays from sunday
+    return '{} {};'.format((time.gmtime(seconds).tm_wday + 1) % 7, time.strftime('%Y/%m/%d %H:%M:%S',
+                                                                              time.gmtime(seconds)))
+
+
+def _escape(data):
+    """
+    Quote bytes the way dhcpd writes the uid and the IPv6 host identifiers
+    """
+    result = []
+    for byte in bytearray(data):
+        if byte in (34, 92):
+            result.append('\\' + chr(byte))
+        elif 32 <= byte < 127:
+            result.append(chr(byte))
+        else:
+            result.append('\\%03o' % byte)
+    return ''.join(result)
+
+
+def _mac(index):
+    return '00:16:3e:{:02x}:{:02x}:{:02x}'.format(index >> 16 & 0xff, index >> 8 & 0xff, index & 0xff)
+
+
+def lease4(index, starts, state, epoch, rng):
+    """
+    :return: text of an IPv4 lease block
+    """
+    ip = '10.{}.{}.{}'.format(index >> 16 & 0xff, index >> 8 & 0xff, index & 0xff)
+    if state == 'backup':
+        # Leases the failover peer may hand out don't have a client
+        return ('lease {} {{\n  starts {}\n  tstp {}\n  tsfp {}\n  atsfp {}\n  binding state backup;\n}}\n'
+                .format(ip, _time(starts, epoch), _time(starts, epoch), _time(starts, epoch), _time(starts, epoch)))
+
+    mac = _mac(index)
+    lines = ['lease {} {{'.format(ip),
+             '  starts {}'.format(_time(starts, epoch)),
+             '  ends {}'.format(_time(starts + 7200, epoch))]
+    if state != 'active':
+        lines.append('  tstp {}'.format(_time(starts + 7200, epoch)))
+    lines += ['  cltt {}'.format(_time(starts, epoch)),
+              '  binding state {};'.format(state),
+              '  next binding state free;',
+              '  rewind binding state free;',
+              '  hardware ethernet {};'.format(mac),
+              '  uid "{}";'.format(_escape(b'\x01' + bytes(bytearray(int(part, 16) for part in mac.split(':')))))]
+    if rng.random() < 0.5:
+        lines.append('  set vendor-class-identifier = "{}";'.format(rng.choice(_vendors)))
+    if rng.random() < 0.3:
+        lines += ['  option agent.circuit-id 0:1:3:{:x};'.format(index & 0xff),
+                  '  option agent.remote-id {};'.format(mac)]
+    if rng.random() < 0.8:
+        lines.append('  client-hostname "host-{}";'.format(index))
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def lease6(index, cltt, state, epoch, rng):
+    """
+    :return: text of an ia-na block with an address or an ia-pd block with a delegated prefix
+    """
+    duid = b'\x00\x01\x00\x01' + bytes(bytearray([index >> 24 & 0xff, index >> 16 & 0xff, index >> 8 & 0xff,
+                                                   index & 0xff, 0x00, 0x16, 0x3e, 0x00, 0x00, 0x01]))
+    if index % 4 == 3:
+        header = 'ia-pd "{}" {{'.format(_escape(b'\x00\x00\x00\x00' + duid))
+        address = '  iaprefix 2001:db8:{:x}:{:x}00::/56 {{'.format(index >> 8 & 0xffff, index & 0xff)
+    else:
+        header = 'ia-na "{}" {{'.format(_escape(b'\x01\x00\x00\x00' + duid))
+        address = '  iaaddr 2001:db8::{:x}:{:x} {{'.format(index >> 16 & 0xffff, index & 0xffff)
+    lines = [header,
+             '  cltt {}'.format(_time(cltt, epoch)),
+             address,
+             '    binding state {};'.format(state),
+             '    preferred-life 540;',
+             '    max-life 864;',
+             '    ends {}'.format(_time(cltt + 864, epoch))]
+    if rng.random() < 0.5:
+        lines.append('    set clientduid = "{}";'.format(''.join('%02x' % byte for byte in bytearray(duid))))
+    lines += ['  }', '}']
+    return '\n'.join(lines) + '\n'
+
+
+def generate(output, leases=10000, ipv6=0.2, renewals=3, backups=0.05, epoch=False, seed=1):
+    """
+    Write a synthetic lease file. Every address gets a first block followed by up to renewals more
+    blocks later in the file, like the journal dhcpd appends to between rewrites.
+    :param output: open file object to write the text to
+    :param leases: number of addresses
+    :param ipv6: fraction of the addresses that are IPv6 addresses or delegated prefixes
+    :param renewals: maximum number of renewals of an address
+    :param backups: fraction of the IPv4 blocks that are free backup leases of the failover peer
+    :param epoch: write the times like "db-time-format local" as seconds since the epoch
+    :return: number of lease blocks written
+    """
+    rng = random.Random(seed)
+    output.write('# The format of this file is documented in the dhcpd.leases(5) manual page.\n'
+                 '# This lease file was written by isc-dhcp-4.4.3\n\n')
+    if ipv6:
+        output.write('server-duid "\\000\\001\\000\\001\\036\\031\\350\\241\\000\\014)\\345\\0202";\n\n')
+
+    # (time of the block, index of the address, number of the renewal)
+    pending = []
+    for index in range(leases):
+        starts = START + rng.randint(0, 86400)
+        pending.append((starts, index, 0))
+        for renewal in range(1, rng.randint(0, renewals) + 1):
+            pending.append((starts + renewal * 3600, index, renewal))
+    pending.sort()
+
+    v6_count = int(leases * ipv6)
+    last_renewal = {}
+    for _, index, renewal in pending:
+        last_renewal[index] = renewal
+
+    for written, index, renewal in pending:
+        final = renewal == last_renewal[index]
+        if index < v6_count:
+            state = 'expired' if final and rng.random() < 0.1 else 'active'
+            output.write(lease6(index, written, state, epoch, rng))
+        elif rng.random() < backups:
+            output.write(lease4(index, written, 'backup', epoch, rng))
+        else:
+            state = 'free' if final and rng.random() < 0.2 else 'active'
+            output.write(lease4(index, written, state, epoch, rng))
+    return len(pending)
+
+
+def generate_file(filename, compress=False, **kwargs):
+    """
+    Write a synthetic lease file to filename, gzip compressed if compress is True
+    :return: number of lease blocks written
+    """
+    if compress:
+        with gzip.open(filename, 'wt') as output:
+            return generate(output, **kwargs)
+    with open(filename, 'w') as output:
+        return generate(output, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n\n')[0])
+    parser.add_argument('output')
+    parser.add_argument('--leases', type=int, default=10000, help='number of addresses')
+    parser.add_argument('--ipv6', type=float, default=0.2, help='fraction of IPv6 leases')
+    parser.add_argument('--renewals', type=int, default=3, help='maximum number of renewals per address')
+    parser.add_argument('--backups', type=float, default=0.05, help='fraction of IPv4 backup leases')
+    parser.add_argument('--epoch', action='store_true', help='write the times as seconds since the epoch')
+    parser.add_argument('--gzip', action='store_true', help='compress the lease file')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    blocks = generate_file(args.output, args.gzip, leases=args.leases, ipv6=args.ipv6, renewals=args.renewals,
+                           backups=args.backups, epoch=args.epoch, seed=args.seed)
+    print('Wrote {} blocks for {} addresses to {}'.format(blocks, args.leases, args.output))
+
+
+if __name__ == '__main__':
+    main()
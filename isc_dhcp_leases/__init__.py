@@ -1,3 +1,10 @@
 from __future__ import absolute_import
-from .iscdhcpleases import IscDhcpLeases, Lease, Lease6
+from .iscdhcpleases import IscDhcpLeases, Lease, Lease6, LazyLease, LazyLease6
+from .table import LeaseTable
+from .index import LeaseIndex
+from .expiry import ExpiryIndex
+from .history import LeaseHistory
+from .pools import PoolCounter
+from .events import LeaseEvent
+from .stats import ParseStats
 __author__ = 'Martijn Braam <martijn@brixit.nl>'
@@ -0,0 +1,149 @@
+import heapq
+import itertools
+from collections import namedtuple
+
+GRANTED = 'granted'
+RENEWED = 'renewed'
+RELEASED = 'released'
+EXPIRED = 'expired'
+MOVED = 'moved'
+
+LeaseEvent = namedtuple('LeaseEvent', ['type', 'ip', 'lease', 'previous'])
+LeaseEvent.__doc__ = """
+Change of a lease between two polls
+
+    type        One of GRANTED, RENEWED, RELEASED, EXPIRED or MOVED
+    ip          The address of the lease
+    lease       The lease after the change
+    previous    The lease before the change, for MOVED the lease of the client on its previous address
+"""
+
+
+def _identity(lease):
+    """
+    :return: the ethernet address of an IPv4 lease or the type and host identifier of an IPv6 lease
+    """
+    if hasattr(lease, 'host_identifier'):
+        return lease.type, lease.host_identifier
+    return lease.ethernet
+
+
+def _is_expiry(lease, previous):
+    """
+    :return: True if the block of lease ended the active lease previous because it expired
+    """
+    if lease.binding_state == 'expired':
+        return True
+    # dhcpd writes a free block when a lease is released and when it expires
+    return lease.binding_state == 'free' and lease.end is not None and previous.end is not None and \
+        lease.end >= previous.end
+
+
+def _times(lease):
+    return getattr(lease, 'start', None), lease.end
+
+
+def _unchanged(lease, previous):
+    """
+    :return: True if lease is the same lease as previous written again, e.g. when the state is rebuilt
+    """
+    return lease.binding_state == previous.binding_state and _identity(lease) == _identity(previous) and \
+        _times(lease) == _times(previous)
+
+
+class LeaseEvents(object):
+    """
+    Turns the lease blocks appended to a lease file into change events. Every block is only compared
+    with the previous block for its address, so the work is proportional to the amount of changes.
+    Expiries are found with a heap of the end times of the active leases.
+    """
+
+    def __init__(self):
+        # The most recent lease for every address
+        self._state = {}
+        # The address of the active lease of every client
+        self._holders = {}
+        # Heap of (end as seconds since the epoch, sequence, ip, lease) for active leases
+        self._expiries = []
+        self._sequence = itertools.count()
+        # Addresses of which the lease already got an EXPIRED event from the heap
+        self._expired = set()
+
+    def feed(self, leases):
+        """
+        Compare new leases with the state and return the events they cause, in the order of the leases
+        """
+        events = []
+        for lease in leases:
+            previous = self._state.get(lease.ip)
+            if previous is not None and _unchanged(lease, previous):
+                # Keep the previous lease, its heap entry and whether it already expired
+                continue
+            self._state[lease.ip] = lease
+            if previous is not None and previous.active:
+                self._release_holder(previous)
+
+            if lease.active:
+                self._expired.discard(lease.ip)
+                event = self._activated(lease, previous)
+                self._holders[_identity(lease)] = lease.ip
+                if lease.end is not None:
+                    heapq.heappush(self._expiries, (lease.end_epoch, next(self._sequence), lease.ip, lease))
+            elif previous is not None and previous.active and lease.ip not in self._expired:
+                event = self._deactivated(lease, previous)
+            else:
+                event = None
+
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _activated(self, lease, previous):
+        identity = _identity(lease)
+        if previous is not None and previous.active and _identity(previous) == identity:
+            if _times(previous) != _times(lease):
+                return LeaseEvent(RENEWED, lease.ip, lease, previous)
+            # The same lease written again, e.g. when dhcpd rewrites the lease file
+            return None
+
+        old_ip = self._holders.get(identity)
+        if old_ip is not None and old_ip != lease.ip:
+            old_lease = self._state[old_ip]
+            del self._holders[identity]
+            return LeaseEvent(MOVED, lease.ip, lease, old_lease)
+        return LeaseEvent(GRANTED, lease.ip, lease, previous)
+
+    def _deactivated(self, lease, previous):
+        if _is_expiry(lease, previous):
+            return LeaseEvent(EXPIRED, lease.ip, lease, previous)
+        if lease.binding_state in ('free', 'released'):
+            return LeaseEvent(RELEASED, lease.ip, lease, previous)
+        return None
+
+    def _release_holder(self, lease):
+        identity = _identity(lease)
+        if self._holders.get(identity) == lease.ip:
+            del self._holders[identity]
+
+    def next_expiry(self):
+        """
+        :return: the end of the first active lease to expire as seconds since the epoch or None
+        """
+        if self._expiries:
+            return self._expiries[0][0]
+        return None
+
+    def expire(self, now):
+        """
+        Return EXPIRED events for the active leases that ended before now
+        :param now: seconds since the epoch
+        """
+        events = []
+        while self._expiries and self._expiries[0][0] < now:
+            _, _, ip, lease = heapq.heappop(self._expiries)
+            # Entries for leases that were superseded by a later block are skipped
+            if self._state.get(ip) is lease:
+                self._release_holder(lease)
+                self._expired.add(ip)
+                events.append(LeaseEvent(EXPIRED, ip, lease, lease))
+        return events
@@ -0,0 +1,224 @@
+import bisect
+import datetime
+import threading
+
+from .events import _is_expiry
+from .iscdhcpleases import utc, _included, _timestamp
+
+
+def _seconds(delta):
+    if isinstance(delta, datetime.timedelta):
+        return delta.total_seconds()
+    return delta
+
+
+class ExpiryIndex(object):
+    """
+    Index of the end times of the most recent active lease for every address in a lease file. The
+    end times are kept in a sorted list, so finding the k leases that expire in a period takes
+    O(log n + k) instead of checking every lease. Infinite leases are not indexed.
+
+    When dhcpd writes the free or expired block for a lease that expired, the lease is kept as
+    expired for retention seconds after its end, so expired_since() and run_expired() still find it.
+    Released leases are not kept.
+
+    Like LeaseIndex, refresh() only indexes the blocks parsed since the previous refresh when the
+    IscDhcpLeases instance is in incremental or cache mode, other calls on the instance don't affect it.
+
+    start() runs the expiry callbacks from a timer thread that fires at the end of next_expiry(). The
+    callbacks can also be driven by calling refresh() and run_expired(), e.g. from an event loop.
+    """
+
+    def __init__(self, leases, include_backups=False, retention=datetime.timedelta(days=1)):
+        """
+        :param leases: IscDhcpLeases instance
+        :param include_backups: also index the leases without a hardware address
+        :param retention: timedelta or seconds to keep the leases that expired after their end
+        """
+        self.leases = leases
+        self.include_backups = include_backups
+        self.retention = _seconds(retention)
+        self._callbacks = []
+        self._cursor = None
+        self._timer = None
+        # Reentrant, so the callbacks can call stop()
+        self._timer_lock = threading.RLock()
+        # The leases that expired by (end as seconds since the epoch, ip) and the sorted keys
+        self._expired = {}
+        self._expired_ends = []
+        self._clear()
+        self.refresh()
+        self._last_run = _timestamp(self._now())
+
+    def _clear(self):
+        self._leases = {}
+        # Sorted list of (end as seconds since the epoch, ip) tuples
+        self._ends = []
+
+    def _now(self, now=None):
+        return now or self.leases.now or datetime.datetime.utcnow().replace(tzinfo=utc)
+
+    def refresh(self):
+        """
+        Update the index with the changes in the lease file
+        """
+        # The expiry blocks are only found by comparing every block with the one before, so a rebuild
+        # replays every block in the file
+        leases, reset, self._cursor = self.leases._changes(self._cursor, history=True)
+        if reset:
+            # The leases that were active before the rebuild, an address is compared with them until
+            # the rebuilt state has a block for it
+            before = self._leases
+            self._clear()
+        for lease in leases:
+            if reset:
+                earlier = before.pop(lease.ip, None)
+                previous = self._leases.pop(lease.ip, earlier)
+            else:
+                previous = self._remove(lease.ip)
+            if previous is not None and _is_expiry(lease, previous):
+                self._add_expired(previous)
+            if lease.active and lease.end is not None and _included(lease, self.include_backups):
+                self._leases[lease.ip] = lease
+                if not reset:
+                    bisect.insort(self._ends, (lease.end_epoch, lease.ip))
+        if reset:
+            self._ends = sorted((lease.end_epoch, ip) for ip, lease in self._leases.items())
+        self._prune(_timestamp(self._now()))
+
+    def _remove(self, ip):
+        """
+        :return: the active lease that was removed or None
+        """
+        lease = self._leases.pop(ip, None)
+        if lease is not None:
+            del self._ends[bisect.bisect_left(self._ends, (lease.end_epoch, ip))]
+        return lease
+
+    def _add_expired(self, lease):
+        key = (lease.end_epoch, lease.ip)
+        if key not in self._expired:
+            self._expired[key] = lease
+            bisect.insort(self._expired_ends, key)
+
+    def _prune(self, now):
+        """
+        Drop the expired leases that ended more than retention seconds before now
+        """
+        position = bisect.bisect_left(self._expired_ends, (now - self.retention,))
+        for key in self._expired_ends[:position]:
+            del self._expired[key]
+        del self._expired_ends[:position]
+
+    def __len__(self):
+        return len(self._leases)
+
+    def _slice(self, start, end):
+        """
+        :return: list of the active leases that end at or after start and before end, sorted by end
+        """
+        first = bisect.bisect_left(self._ends, (start,))
+        last = bisect.bisect_left(self._ends, (end,))
+        return [self._leases[ip] for _, ip in self._ends[first:last]]
+
+    def _ended(self, start, end):
+        """
+        :return: list of the active and expired leases that end at or after start and before end, sorted by end
+        """
+        first = bisect.bisect_left(self._expired_ends, (start,))
+        last = bisect.bisect_left(self._expired_ends, (end,))
+        leases = self._slice(start, end) + [self._expired[key] for key in self._expired_ends[first:last]]
+        leases.sort(key=lambda lease: lease.end_epoch)
+        return leases
+
+    def expiring_within(self, delta, now=None):
+        """
+        :param delta: timedelta or seconds
+        :param now: datetime, the current time if None
+        :return: list of the leases that are valid at now and expire within delta, sorted by end
+        """
+        now = _timestamp(self._now(now))
+        return self._slice(now, now + _seconds(delta))
+
+    def expired_since(self, since, now=None):
+        """
+        Find the leases that expired, whether dhcpd already wrote the block for their expiry or not.
+        Expired leases are only kept for retention seconds after their end.
+        :param since: datetime
+        :param now: datetime, the current time if None
+        :return: list of the leases that expired between since and now as they were while active, sorted by end
+        """
+        return self._ended(_timestamp(since), _timestamp(self._now(now)))
+
+    def next_expiry(self, now=None):
+        """
+        :param now: datetime, the current time if None
+        :return: the first lease to expire after now or None
+        """
+        position = bisect.bisect_left(self._ends, (_timestamp(self._now(now)),))
+        if position == len(self._ends):
+            return None
+        return self._leases[self._ends[position][1]]
+
+    def on_expiry(self, callback):
+        """
+        Register a callback that run_expired() calls with every lease that expired
+        """
+        self._callbacks.append(callback)
+
+    def run_expired(self, now=None):
+        """
+        Call the callbacks for the leases that expired since the previous call, or since the index was
+        created for the first call. Call refresh() before to see the renewals in the lease file. The timer
+        of start() calls both.
+        :param now: datetime, the current time if None
+        :return: list of the expired leases, sorted by end
+        """
+        now = _timestamp(self._now(now))
+        expired = self._ended(self._last_run, now)
+        self._last_run = now
+        for lease in expired:
+            for callback in self._callbacks:
+                callback(lease)
+        return expired
+
+    def start(self, interval=60):
+        """
+        Call the expiry callbacks when leases expire, without calls to run_expired(). A threading.Timer
+        fires at the end of next_expiry() and at least every interval seconds to see the changes in the
+        lease file, refreshes the index and calls run_expired(). The callbacks run in the timer thread.
+        :param interval: maximum number of seconds between refreshes
+        """
+        with self._timer_lock:
+            if self._timer is None:
+                self._arm(interval)
+
+    def stop(self):
+        """
+        Stop the timer started by start()
+        """
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _arm(self, interval):
+        delay = interval
+        lease = self.next_expiry()
+        if lease is not None:
+            delay = min(delay, max(0, lease.end_epoch - _timestamp(self._now())))
+        self._timer = threading.Timer(delay, self._fire, (interval,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self, interval):
+        with self._timer_lock:
+            if self._timer is None:
+                # Stopped while the timer fired
+                return
+            try:
+                self.refresh()
+                self.run_expired()
+            finally:
+                if self._timer is not None:
+                    self._arm(interval)
@@ -0,0 +1,223 @@
+import bisect
+import datetime
+from collections import namedtuple
+
+from .iscdhcpleases import IscDhcpLeases, Lease6, _parse_epoch, _timestamp
+
+HistoryEntry = namedtuple('HistoryEntry', ['start', 'end', 'ip', 'client', 'hostname', 'binding_state',
+                                           'cltt', 'tstp'])
+HistoryEntry.__doc__ = """
+One lease block from the history of a lease file, the times are in seconds since the epoch
+
+    start           The start of the lease, the last communication for IPv6 leases
+    end             The end of the lease or None if this is an infinite lease
+    ip              The address of the lease
+    client          The ethernet address of an IPv4 lease or the hexadecimal host identifier of an IPv6 lease
+    hostname        The hostname for an IPv4 lease if given by the client
+    binding_state   The binding state as string
+    cltt            The last communication with the client or None
+    tstp            The time the lease ended for the failover peer, e.g. when it was released, or None
+"""
+
+_NEVER = float('inf')
+
+
+def _entry(lease):
+    tstp = _parse_epoch(lease.data.get('tstp'))
+    if isinstance(lease, Lease6):
+        cltt = lease.last_communication_epoch
+        return HistoryEntry(cltt, lease.end_epoch, lease.ip, lease.host_identifier_string, '', lease.binding_state,
+                            cltt, tstp)
+    client = lease.ethernet.lower() if lease.ethernet is not None else None
+    return HistoryEntry(lease.start_epoch, lease.end_epoch, lease.ip, client, lease.hostname, lease.binding_state,
+                        _parse_epoch(lease.data.get('cltt')), tstp)
+
+
+def _written(entry):
+    """
+    :return: the time dhcpd wrote the block, the last of its times except the end
+    """
+    times = [time for time in (entry.start, entry.cltt, entry.tstp) if time is not None]
+    if times:
+        return max(times)
+    return entry.end if entry.end is not None else 0
+
+
+def _time_key(entry):
+    return _written(entry), (entry.end if entry.end is not None else _NEVER)
+
+
+def _seconds(when):
+    if isinstance(when, datetime.datetime):
+        return _timestamp(when)
+    return when
+
+
+class _Intervals(object):
+    """
+    Intervals sorted by start with the running maximum of their stops, the intervals that contain a
+    time are found with a binary search followed by a scan back that stops at the first prefix that
+    ended before that time
+    """
+
+    __slots__ = ('starts', 'stops', 'entries', 'max_stops')
+
+    def __init__(self, intervals):
+        intervals.sort(key=lambda interval: interval[:2])
+        self.starts = [start for start, _, _ in intervals]
+        self.stops = [stop for _, stop, _ in intervals]
+        self.entries = [entry for _, _, entry in intervals]
+        self.max_stops = []
+        max_stop = -_NEVER
+        for stop in self.stops:
+            max_stop = max(max_stop, stop)
+            self.max_stops.append(max_stop)
+
+    def overlapping(self, first, last):
+        """
+        :return: list of the entries of the intervals that overlap [first, last], sorted by start
+        """
+        position = bisect.bisect_right(self.starts, last)
+        result = []
+        for index in range(position - 1, -1, -1):
+            if self.max_stops[index] <= first:
+                break
+            if self.stops[index] > first:
+                result.append(self.entries[index])
+        result.reverse()
+        return result
+
+
+class LeaseHistory(object):
+    """
+    Time ordered history of the lease blocks for every address and every client, collected from one or
+    more lease files. A block that appears in several files, like in daily copies of the lease file, is
+    only stored once. The history stores small HistoryEntry tuples instead of the lease objects.
+
+    The history also answers which client held an address, or which addresses a client held, at a point
+    in time or during a period. An active block holds its address from its start until its end, or until
+    the next block for the address was written when that is earlier. The intervals are indexed on the
+    first query after blocks were added.
+    """
+
+    def __init__(self):
+        self._seen = set()
+        self._ip = {}
+        self._client = {}
+        self._ip_intervals = None
+        self._client_intervals = None
+
+    @classmethod
+    def from_files(cls, filenames, workers=1, include_backups=False, **kwargs):
+        """
+        Build the history of a list of lease files, parsed by IscDhcpLeases.from_files(). Only the lease
+        objects of the files that are being parsed are kept in memory.
+        """
+        history = cls()
+        for _, leases in IscDhcpLeases.from_files(filenames, workers, include_backups, **kwargs):
+            history.add(leases)
+        return history
+
+    def add(self, leases):
+        """
+        Add the lease blocks to the history
+        :return: the number of blocks that weren't in the history yet
+        """
+        # The lists that got new entries by their id
+        changed = {}
+        added = 0
+        for lease in leases:
+            entry = _entry(lease)
+            if entry in self._seen:
+                continue
+            self._seen.add(entry)
+            added += 1
+            keys = [(self._ip, entry.ip)]
+            if entry.client is not None:
+                keys.append((self._client, entry.client))
+            for index, key in keys:
+                entries = index.setdefault(key, [])
+                entries.append(entry)
+                changed[id(entries)] = entries
+
+        # Sorting lists that mostly are sorted already takes linear time
+        for entries in changed.values():
+            entries.sort(key=_time_key)
+        if added:
+            self._ip_intervals = None
+            self._client_intervals = None
+        return added
+
+    def __len__(self):
+        return len(self._seen)
+
+    def by_ip(self, ip):
+        """
+        :return: list of the HistoryEntry tuples of an address, ordered by the time they were written
+        """
+        return list(self._ip.get(ip, []))
+
+    def by_client(self, client):
+        """
+        :return: list of the HistoryEntry tuples of an ethernet address or IPv6 host identifier, ordered by
+                 the time they were written
+        """
+        return list(self._client.get(client.lower(), []))
+
+    def _index(self):
+        """
+        Build the intervals in which the active blocks held their address
+        """
+        ip_intervals = {}
+        client_intervals = {}
+        for ip, entries in self._ip.items():
+            for position, entry in enumerate(entries):
+                if entry.binding_state != 'active':
+                    continue
+                start = entry.start if entry.start is not None else -_NEVER
+                stop = entry.end if entry.end is not None else _NEVER
+                if position + 1 < len(entries):
+                    stop = min(stop, _written(entries[position + 1]))
+                if stop <= start:
+                    continue
+                ip_intervals.setdefault(ip, []).append((start, stop, entry))
+                if entry.client is not None:
+                    client_intervals.setdefault(entry.client, []).append((start, stop, entry))
+
+        self._ip_intervals = dict((ip, _Intervals(intervals)) for ip, intervals in ip_intervals.items())
+        self._client_intervals = dict((client, _Intervals(intervals))
+                                      for client, intervals in client_intervals.items())
+
+    def _overlapping(self, first, last, ip, client):
+        if (ip is None) == (client is None):
+            raise ValueError("Pass either ip or client")
+        if self._ip_intervals is None:
+            self._index()
+        if ip is not None:
+            intervals = self._ip_intervals.get(ip)
+        else:
+            intervals = self._client_intervals.get(client.lower())
+        if intervals is None:
+            return []
+        return intervals.overlapping(_seconds(first), _seconds(last))
+
+    def at(self, when, ip=None, client=None):
+        """
+        Find the active leases of an address or a client at a point in time
+        :param when: datetime or seconds since the epoch
+        :param ip: the address to get the lease for
+        :param client: the ethernet address or IPv6 host identifier to get the leases for
+        :return: list of HistoryEntry tuples, ordered by start
+        """
+        return self._overlapping(when, when, ip, client)
+
+    def between(self, first, last, ip=None, client=None):
+        """
+        Find the active leases of an address or a client during a period
+        :param first: datetime or seconds since the epoch
+        :param last: datetime or seconds since the epoch
+        :param ip: the address to get the leases for
+        :param client: the ethernet address or IPv6 host identifier to get the leases for
+        :return: list of HistoryEntry tuples, ordered by start
+        """
+        return self._overlapping(first, last, ip, client)
@@ -0,0 +1,182 @@
+import bisect
+
+from .iscdhcpleases import Lease6, _included
+from .table import ip_to_int, network_range
+
+
+class LeaseIndex(object):
+    """
+    Index of the most recent lease for every address in a lease file, answers lookups by ip,
+    ethernet address, hostname, DUID and host identifier in O(1) and network or range queries
+    with a binary search on the sorted addresses. Delegated prefixes are indexed by prefix length to
+    find the delegation an address belongs to with one lookup per distinct prefix length.
+
+    When the IscDhcpLeases instance is in incremental mode refresh() only indexes the blocks that
+    were appended to the lease file since the previous refresh, in cache mode refresh() doesn't do
+    anything while the lease file is unchanged. The index keeps its own position in the leases of the
+    IscDhcpLeases instance, so get() and other indexes on the same instance don't affect it.
+    """
+
+    def __init__(self, leases, include_backups=False):
+        """
+        :param leases: IscDhcpLeases instance
+        :param include_backups: also index the leases without a hardware address
+        """
+        self.leases = leases
+        self.include_backups = include_backups
+        self._cursor = None
+        self._clear()
+        self.refresh()
+
+    def _clear(self):
+        self._ip = {}
+        self._ethernet = {}
+        self._hostname = {}
+        self._duid = {}
+        self._host_identifier = {}
+        # Sorted list of (family, address as int, ip) tuples
+        self._addresses = []
+        # Delegated prefixes as {prefix length: {network as int: ip}}
+        self._prefixes = {}
+
+    def refresh(self):
+        """
+        Update the index with the changes in the lease file
+        """
+        leases, reset, self._cursor = self.leases._changes(self._cursor)
+        if reset:
+            self._clear()
+        for lease in leases:
+            self._remove(lease.ip)
+            if _included(lease, self.include_backups):
+                self._add(lease)
+                if reset:
+                    self._addresses.append(self._address_key(lease))
+                else:
+                    bisect.insort(self._addresses, self._address_key(lease))
+        if reset:
+            self._addresses.sort()
+
+    def _keys(self, lease):
+        """
+        :return: list of (index, key) tuples for the secondary indexes of the lease
+        """
+        if isinstance(lease, Lease6):
+            return [(self._duid, lease.duid), (self._host_identifier, lease.host_identifier)]
+        keys = []
+        if lease.hostname:
+            keys.append((self._hostname, lease.hostname.lower()))
+        if lease.ethernet is not None:
+            keys.append((self._ethernet, lease.ethernet.lower()))
+        return keys
+
+    def _address_key(self, lease):
+        family, address, _ = ip_to_int(lease.ip)
+        return family, address, lease.ip
+
+    def _add(self, lease):
+        self._ip[lease.ip] = lease
+        for index, key in self._keys(lease):
+            index.setdefault(key, {})[lease.ip] = lease
+        if isinstance(lease, Lease6) and lease.type == Lease6.PREFIX_DELEGATION:
+            _, address, prefix_length = ip_to_int(lease.ip)
+            self._prefixes.setdefault(prefix_length, {})[address] = lease.ip
+
+    def _remove(self, ip):
+        """
+        Remove the lease for ip from all indexes, the address list has to be sorted
+        """
+        lease = self._ip.pop(ip, None)
+        if lease is None:
+            return
+        for index, key in self._keys(lease):
+            leases = index[key]
+            del leases[ip]
+            if not leases:
+                del index[key]
+        key = self._address_key(lease)
+        position = bisect.bisect_left(self._addresses, key)
+        del self._addresses[position]
+        if isinstance(lease, Lease6) and lease.type == Lease6.PREFIX_DELEGATION:
+            _, address, prefix_length = ip_to_int(ip)
+            prefixes = self._prefixes[prefix_length]
+            del prefixes[address]
+            if not prefixes:
+                del self._prefixes[prefix_length]
+
+    def __len__(self):
+        return len(self._ip)
+
+    def __contains__(self, ip):
+        return ip in self._ip
+
+    def by_ip(self, ip):
+        """
+        :return: the lease for the ip address or None
+        """
+        return self._ip.get(ip)
+
+    def by_ethernet(self, ethernet):
+        """
+        :return: list of the IPv4 leases of the ethernet address
+        """
+        return list(self._ethernet.get(ethernet.lower(), {}).values())
+
+    def by_hostname(self, hostname):
+        """
+        :return: list of the IPv4 leases with the hostname, compared case-insensitive
+        """
+        return list(self._hostname.get(hostname.lower(), {}).values())
+
+    def by_duid(self, duid):
+        """
+        :return: list of the IPv6 leases of the DUID as bytes
+        """
+        return list(self._duid.get(duid, {}).values())
+
+    def by_host_identifier(self, host_identifier):
+        """
+        :return: list of the IPv6 leases of the host identifier (IAID + DUID) as bytes
+        """
+        return list(self._host_identifier.get(host_identifier, {}).values())
+
+    def by_prefix(self, address):
+        """
+        Find the delegated prefix that contains an IPv6 address or a smaller prefix
+        :param address: an address like "2001:10:30:ff00::1" or a prefix like "2001:10:30:ff10::/60"
+        :return: the prefix delegation lease with the longest matching prefix or None
+        """
+        family, address, length = ip_to_int(address)
+        if family != 6:
+            return None
+        for prefix_length in sorted(self._prefixes, reverse=True):
+            if prefix_length > length:
+                continue
+            network = address & ~((1 << (128 - prefix_length)) - 1)
+            ip = self._prefixes[prefix_length].get(network)
+            if ip is not None:
+                return self._ip[ip]
+        return None
+
+    def in_range(self, first, last):
+        """
+        :return: list of the leases with an address between first and last (inclusive), sorted by address
+        """
+        first = ip_to_int(first)[:2]
+        last = ip_to_int(last)[:2]
+        return self._slice(first, last)
+
+    def in_network(self, network):
+        """
+        :return: list of the leases in a network like "10.4.0.0/16", sorted by address
+        """
+        return self._slice(*network_range(network))
+
+    def _slice(self, first, last):
+        start = bisect.bisect_left(self._addresses, first)
+        # Every (family, address, ip) tuple sorts after (family, address)
+        end = bisect.bisect_left(self._addresses, (last[0], last[1] + 1))
+        return [self._ip[ip] for _, _, ip in self._addresses[start:end]]
+
+    def __iter__(self):
+        return iter(self._ip.values())
@@ -1,12 +1,51 @@
 import binascii
-import codecs
+import calendar
+import collections
 import datetime
-import re
+import mmap
+import os
 import struct
 import gzip
+import threading
+import time
 
 from six import iteritems
 
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+
+try:
+    import lzma
+except ImportError:
+    # Python 2.7
+    lzma = None
+
+try:
+    # Python 3.14
+    from compression import zstd as _zstd
+    _open_zstd = _zstd.open
+except ImportError:
+    try:
+        import zstandard
+    except ImportError:
+        _open_zstd = None
+    else:
+        def _open_zstd(filename):
+            return zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), read_across_frames=True)
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    # Python 2.7 without the futures backport, parse in a single process
+    ProcessPoolExecutor = None
+
+from .events import LeaseEvents
+from .snapshot import LeaseSnapshot, write_snapshot
+from .stats import ParseStats, _clock
+from .table import LeaseTable, ip_to_int, network_range
+
 
 try:
     utc = datetime.timezone.utc
@@ -33,22 +72,102 @@ def check_datetime(dt):
     if not (dt is None or (isinstance(dt, datetime.datetime) and dt.tzinfo)):
         raise ValueError('None or offset-aware datetime required')
 
+_epoch = datetime.datetime(1970, 1, 1, tzinfo=utc)
+
+# Lease files repeat the same times a lot, parsed times are cached up to this amount of distinct times
+TIME_CACHE_SIZE = 16384
+_time_cache = {}
+_epoch_cache = {}
+
+
 def parse_time(s):
     """
     Like datetime.datetime.strptime(s, "%w %Y/%m/%d %H:%M:%S") but 5x faster.
+    Also parses the "epoch 1507216949" format, results are cached.
     """
-    result = None
+    try:
+        return _time_cache[s]
+    except KeyError:
+        pass
+
+    result = _epoch + datetime.timedelta(seconds=parse_time_epoch(s))
+
+    if len(_time_cache) >= TIME_CACHE_SIZE:
+        _time_cache.clear()
+    _time_cache[s] = result
+    return result
+
 
-    if "epoch" in s:
-        epoch_time = float(s.rstrip().split(' ')[1][:-1])
-        result = datetime.datetime.utcfromtimestamp(epoch_time)
+def parse_time_epoch(s):
+    """
+    Parse a time from the lease file to seconds since the epoch as int. Results are cached.
+    """
+    try:
+        return _epoch_cache[s]
+    except KeyError:
+        pass
+
+    if s[:6] == 'epoch ':
+        # epoch 1507216949; # Thu Oct 05 15:22:29 2017
+        end = s.find(';')
+        result = int(s[6:end if end != -1 else None])
+    elif len(s) == 21 and s[6] == '/' and s[18] == ':':
+        # 2 2013/12/10 12:57:04
+        result = calendar.timegm((int(s[2:6]), int(s[7:9]), int(s[10:12]),
+                                  int(s[13:15]), int(s[16:18]), int(s[19:21])))
     else:
         _, date_part, time_part = s.split(' ')
         year, mon, day = date_part.split('/')
         hour, minute, sec = time_part.split(':')
-        result = datetime.datetime(*map(int, (year, mon, day, hour, minute, sec)))
+        result = calendar.timegm(tuple(map(int, (year, mon, day, hour, minute, sec))))
+
+    if len(_epoch_cache) >= TIME_CACHE_SIZE:
+        _epoch_cache.clear()
+    _epoch_cache[s] = result
+    return result
+
+
+def _parse_epoch(s):
+    """
+    Parse a time from the lease file to seconds since the epoch
+    :return: int or None for missing and infinite times
+    """
+    if s is None or s == 'never':
+        return None
+    return parse_time_epoch(s)
+
+
+def _timestamp(dt):
+    """
+    :return: the offset-aware datetime dt as seconds since the epoch, including the microseconds
+    """
+    return calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1000000.0
+
+
+def _from_epoch(seconds):
+    """
+    :return: the offset-aware datetime for seconds since the epoch or None if seconds is None
+    """
+    if seconds is None:
+        return None
+    return _epoch + datetime.timedelta(seconds=seconds)
 
-    return result.replace(tzinfo=utc)
+
+def _to_epoch(dt):
+    """
+    :return: the offset-aware datetime dt as seconds since the epoch or None if dt is None
+    """
+    if dt is None:
+        return None
+    return calendar.timegm(dt.utctimetuple())
+
+
+# Keys and enum-like values repeat in every lease block, they are shared between the leases
+_interned_strings = {}
+_intern = _interned_strings.setdefault
+
+# Properties with a value from a small set like "state active" or "binding state free"
+_interned_values = frozenset(['binding', 'next', 'rewind'])
 
 
 def _extract_prop_option(line):
@@ -89,15 +208,24 @@ def _extract_prop_general(line):
 
 def _extract_properties(config):
     """
-    Parse a line within a lease block
-    The line should basically match the expression:
+    Parse the lines within a lease block
+    The lines should basically match the expression:
     >>> r"\s+(?P<key>(?:option|set)\s+\S+|\S+) (?P<value>[\s\S]+?);"
-    For easier seperation of the cases and faster parsing this is done using substrings etc..
     :param config:
     :return: tuple of properties dict, options dict and sets dict
     """
+    return _extract_property_lines(config.splitlines())
+
+
+def _extract_property_lines(lines):
+    """
+    Parse a list of lines within a lease block
+    For easier seperation of the cases and faster parsing this is done using substrings etc..
+    :param lines:
+    :return: tuple of properties dict, options dict and sets dict
+    """
     general, options, sets = {}, {}, {}
-    for line in config.splitlines():
+    for line in lines:
 
         # skip empty & malformed lines
         if not line or not line[-1:] == ';' and '; #' not in line:
@@ -109,90 +237,1070 @@ def _extract_properties(config):
         # seperate the three cases
         if line[:6] == 'option':
             key, value = _extract_prop_option(line)
-            options[key] = value
+            options[_intern(key, key)] = value
 
         elif line[:3] == 'set':
             key, value = _extract_prop_set(line)
-            sets[key] = value
+            sets[_intern(key, key)] = value
 
         else:
             # fall through to generic case
             key, value = _extract_prop_general(line)
+            key = _intern(key, key)
+            if key in _interned_values:
+                value = _intern(value, value)
             general[key] = value
 
     return general, options, sets
 
 
+def _extract_keys(lines, keys):
+    """
+    Parse only the general properties with one of the keys from a list of lines within a lease block
+    :return: properties dict
+    """
+    properties = {}
+    for line in lines:
+        pos = line.find(' ')
+        key = line[:pos]
+        if key in keys and (line[-1:] == ';' or '; #' in line):
+            properties[_intern(key, key)] = line[pos + 1:-1]
+    return properties
+
+
+def _values(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return value
+    return [value]
+
+
+class _Where(object):
+    """
+    Predicates for the where argument of IscDhcpLeases.get(), checked on the few properties of a block
+    they need before the lease object is created
+    """
+
+    # Property keys that every predicate needs
+    _keys = {
+        'ip': (),
+        'network': (),
+        'binding_state': ('binding',),
+        'hardware': ('hardware',),
+        'ethernet': ('hardware',),
+        'start_after': ('starts',),
+        'start_before': ('starts',),
+        'end_after': ('ends',),
+        'end_before': ('ends',),
+    }
+
+    def __init__(self, where):
+        self.keys = set()
+        for name in where:
+            if name not in self._keys:
+                raise ValueError("Unknown predicate {}".format(name))
+            self.keys.update(self._keys[name])
+
+        self.ips = set(_values(where['ip'])) if 'ip' in where else None
+        self.networks = [network_range(network) for network in _values(where['network'])] \
+            if 'network' in where else None
+        self.binding_states = set('state ' + state for state in _values(where['binding_state'])) \
+            if 'binding_state' in where else None
+        self.hardware = set(_values(where['hardware'])) if 'hardware' in where else None
+        self.ethernet = tuple(prefix.lower() for prefix in _values(where['ethernet'])) \
+            if 'ethernet' in where else None
+        self.start_after = _timestamp(where['start_after']) if 'start_after' in where else None
+        self.start_before = _timestamp(where['start_before']) if 'start_before' in where else None
+        self.end_after = _timestamp(where['end_after']) if 'end_after' in where else None
+        self.end_before = _timestamp(where['end_before']) if 'end_before' in where else None
+
+    def match(self, ip, properties):
+        """
+        :param properties: dict with at least the properties of the block with a key in self.keys
+        """
+        if self.ips is not None and ip not in self.ips:
+            return False
+        if self.networks is not None:
+            address = ip_to_int(ip)[:2]
+            if not any(first <= address <= last for first, last in self.networks):
+                return False
+        if self.binding_states is not None and properties.get('binding') not in self.binding_states:
+            return False
+
+        if self.hardware is not None or self.ethernet is not None:
+            hardware = properties.get('hardware')
+            if hardware is None:
+                return False
+            hardware_type, _, address = hardware.partition(' ')
+            if self.hardware is not None and hardware_type not in self.hardware:
+                return False
+            if self.ethernet is not None and not address.lower().startswith(self.ethernet):
+                return False
+
+        if self.start_after is not None or self.start_before is not None:
+            start = _parse_epoch(properties.get('starts'))
+            if start is None or (self.start_after is not None and start < self.start_after) or \
+                    (self.start_before is not None and start > self.start_before):
+                return False
+
+        if self.end_after is not None or self.end_before is not None:
+            # A lease without end never ends
+            end = _parse_epoch(properties.get('ends'))
+            if end is None:
+                return self.end_before is None
+            if (self.end_after is not None and end < self.end_after) or \
+                    (self.end_before is not None and end > self.end_before):
+                return False
+        return True
+
+
+# Property keys that the attributes of the lease objects are parsed from, None for all properties
+_field_keys = {
+    'ip': (),
+    'type': (),
+    'host_identifier': (),
+    'host_identifier_string': (),
+    'iaid': (),
+    'duid': (),
+    'last_communication': (),
+    'last_communication_epoch': (),
+    'binding_state': ('binding',),
+    'active': ('binding',),
+    'start': ('starts',),
+    'start_epoch': ('starts',),
+    'end': ('ends',),
+    'end_epoch': ('ends',),
+    'valid': ('starts', 'ends'),
+    'hardware': ('hardware',),
+    'ethernet': ('hardware',),
+    'hostname': ('client-hostname',),
+    'preferred_life': ('preferred-life',),
+    'max_life': ('max-life',),
+}
+
+
+def _record_type(fields):
+    """
+    :return: namedtuple for the fields of a projection, attributes that a lease doesn't have are None
+    """
+    for field in fields:
+        if not hasattr(Lease, field) and not hasattr(Lease6, field):
+            raise ValueError("Leases don't have a {} attribute".format(field))
+    return collections.namedtuple('LeaseFields', fields)
+
+
+def _block_lines(lines):
+    """
+    Consume the lines of a block from the lines iterator up to and including the closing brace
+    :param lines: iterator positioned right after the line that opened the block
+    :return: list of the stripped statements in the block in file order, including the statements in nested
+             blocks like "on commit { ... }"
+    """
+    statements = []
+    depth = 1
+    for line in lines:
+        line = line.strip()
+        if line == '}':
+            depth -= 1
+            if not depth:
+                break
+        elif line[-1:] == '{':
+            depth += 1
+        else:
+            statements.append(line)
+    return statements
+
+
+def _iter_blocks(lease_data, stats=None):
+    """
+    Walk the lease data in a single pass and yield a tuple for every lease in it:
+    >>> (ip, lines, None)  # for an IPv4 lease block
+    >>> (ip, lines, (type, host_identifier, cltt, quoted))  # for every iaaddr or iaprefix in an IPv6 ia-* block
+    quoted is True for a host identifier in escaped string form and False for the colon separated hex form.
+    Other top-level blocks like failover peer and host declarations and statements like server-duid are skipped.
+    :param lease_data: contents of the lease file
+    :param stats: ParseStats instance that counts the skipped declarations and malformed top-level lines
+    """
+    lines = iter(lease_data.splitlines())
+    for line in lines:
+        line = line.strip()
+        if line[-1:] != '{':
+            # Comments and top-level statements like server-duid and authoring-byte-order
+            if stats is not None and line and line[0] != '#' and line[-1:] != ';' and '; #' not in line:
+                stats.malformed_lines += 1
+            continue
+
+        if line[:6] == 'lease ':
+            yield line[6:-1].strip(), _block_lines(lines), None
+
+        elif line[:3] == 'ia-':
+            # ia-na "\001\000\000\000..." { or ia-na 01:00:00:00:... {
+            if '"' in line:
+                ia = [line[3:5], line[line.find('"') + 1:line.rfind('"')], None, True]
+            else:
+                ia = [line[3:5], line[6:-1].strip(), None, False]
+            addresses = []
+            for line in lines:
+                line = line.strip()
+                if line == '}':
+                    break
+                elif line[:7] == 'iaaddr ' or line[:9] == 'iaprefix ':
+                    addresses.append((line[line.find(' ') + 1:-1].strip(), _block_lines(lines)))
+                elif line[-1:] == '{':
+                    _block_lines(lines)
+                elif line[:5] == 'cltt ':
+                    ia[2] = line[5:-1]
+
+            ia = tuple(ia)
+            for ip, statements in addresses:
+                yield ip, statements, ia
+
+        else:
+            # failover peer, host, class and other declarations that don't describe a lease
+            _block_lines(lines)
+            if stats is not None:
+                stats.block(line.split(' ', 1)[0])
+
+
+def _split_points(lease_data, parts):
+    """
+    Find the offsets to split lease_data into about equally sized parts on block boundaries
+    :return: list of offsets starting with 0 and ending with the length of lease_data
+    """
+    size = len(lease_data)
+    points = [0]
+    for part in range(1, parts):
+        pos = lease_data.find(b'\n}', max(size * part // parts, points[-1]))
+        if pos == -1:
+            break
+        if pos + 2 > points[-1]:
+            points.append(pos + 2)
+    if points[-1] < size:
+        points.append(size)
+    return points
+
+
+def _iter_mapped_chunks(lease_map, offset, chunk_size):
+    """
+    Yield the data of a memory-mapped lease file from offset in decoded pieces of about chunk_size
+    bytes that end on a block boundary. Data after the last complete block is left out.
+    :return: iterator of tuples of the data and the offset of its end
+    """
+    while True:
+        end = lease_map.find(b'\n}', offset + chunk_size)
+        last = end == -1
+        if last:
+            end = lease_map.rfind(b'\n}', offset)
+            if end == -1:
+                return
+        end += 2
+        yield lease_map[offset:end].decode('utf-8'), end
+        if last:
+            return
+        offset = end
+
+
+def _parse_range(args):
+    """
+    Parse the leases between two offsets of a lease file, runs in a worker process
+    """
+    filename, start, end, include_backups, now, lazy, stats = args
+    started = _clock()
+    with open(filename, 'rb') as lease_file:
+        lease_file.seek(start)
+        lease_data = lease_file.read(end - start).decode('utf-8')
+    if stats is not None:
+        stats.timings['read'] += _clock() - started
+        stats.bytes_read += end - start
+        stats.chunks += 1
+    leases = IscDhcpLeases(filename, now=now, lazy=lazy, stats=stats)
+    return list(leases._parse(lease_data, include_backups)), stats
+
+
+def _parse_file(args):
+    """
+    Parse a whole lease file, runs in a worker process for IscDhcpLeases.from_files()
+    """
+    filename, include_backups, kwargs = args
+    leases = IscDhcpLeases(filename, **kwargs)
+    return list(leases.iter_leases(include_backups)), leases.stats
+
+
+# Amount of bytes read from the lease file at once when streaming
+CHUNK_SIZE = 1024 * 1024
+
+# Magic bytes of the compressed formats and the functions to open them, None if the module is missing
+_compressions = [
+    (b'\x1f\x8b', gzip.open),
+    (b'BZh', bz2.BZ2File if bz2 is not None else None),
+    (b'\xfd7zXZ\x00', lzma.open if lzma is not None else None),
+    (b'\x28\xb5\x2f\xfd', _open_zstd),
+]
+
+
+def _compression(filename):
+    """
+    Detect the compression of a file from its magic bytes
+    :return: function that opens the file for reading the decompressed data or None if it isn't compressed
+    """
+    with open(filename, 'rb') as lease_file:
+        magic = lease_file.read(6)
+    for prefix, opener in _compressions:
+        if magic.startswith(prefix):
+            if opener is None:
+                raise ValueError("The module to decompress {} is not installed".format(filename))
+            return opener
+    return None
+
+
 class IscDhcpLeases(object):
     """
     Class to parse isc-dhcp-server lease files into lease objects
     """
 
-    regex_leaseblock = re.compile(r"lease (?P<ip>\d+\.\d+\.\d+\.\d+) {(?P<config>[\s\S]+?)\n}")
-    regex_leaseblock6 = re.compile(
-        r"ia-(?P<type>ta|na|pd) \"(?P<id>[^\"\\]*(?:\\.[^\"\\]*)*)\" {(?P<config>[\s\S]+?)\n}")
-    regex_iaaddr = re.compile(r"ia(addr|prefix) (?P<ip>[0-9a-f:]+(/[0-9]+)?) {(?P<config>[\s\S]+?)\n\s+}")
-
-    def __init__(self, filename, gzip=False, now=None):
+    def __init__(self, filename, gzip=False, now=None, incremental=False, lazy=False, workers=1, cache=False,
+                 cache_ttl=None, stats=None):
+        """
+        :param stats: ParseStats instance that collects the counters and timings of every parse, see ParseStats
+        """
         check_datetime(now)
 
         self.filename = filename
         self.gzip = gzip
         self.now = now
+        self.incremental = incremental
+        self.lazy = lazy
+        self.workers = workers
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+
+        self._leases = []
+        self._latest = {}
+        self._inode = None
+        self._offset = 0
+        # Incremented every time the maintained leases are rebuilt, see _changes()
+        self._generation = 0
+
+        # Protects the maintained leases in incremental and cache mode
+        self._lock = threading.RLock()
+        self._file_key = None
+        self._refreshed = None
+        self._events = LeaseEvents()
+        self._events_cursor = None
+
+        # The stages of the parse pipeline, replaced by measuring versions when collecting stats so the
+        # pipeline doesn't check for them on every block
+        self.stats = stats
+        if stats is None:
+            self._tokenize = _iter_blocks
+            self._extract = _extract_property_lines
+            self._construct = self._create_lease
+        else:
+            self._tokenize = self._measured_tokenize
+            self._extract = self._measured_extract
+            self._construct = self._measured_construct
+
+    @classmethod
+    def from_files(cls, filenames, workers=1, include_backups=False, **kwargs):
+        """
+        Parse a list of lease files, e.g. rotated or archived copies of the lease file, and yield a tuple
+        of the filename and the list of Lease instances for every file in the order of filenames.
 
-    def get(self, include_backups=False):
+        With more than one worker the files are parsed concurrently in a pool of worker processes. At most
+        two files per worker are parsed ahead of the consumer, so the memory usage doesn't depend on the
+        number of files.
+        :param kwargs: other arguments for IscDhcpLeases, like now, lazy or stats
+        """
+        if workers <= 1 or ProcessPoolExecutor is None:
+            for filename in filenames:
+                yield filename, _parse_file((filename, include_backups, kwargs))[0]
+            return
+
+        # Every worker fills its own stats, they are added to the stats of the caller
+        stats = kwargs.get('stats')
+
+        def job(filename):
+            if stats is None:
+                return filename, include_backups, kwargs
+            return filename, include_backups, dict(kwargs, stats=ParseStats())
+
+        def result(future):
+            leases, job_stats = future.result()
+            if stats is not None:
+                stats.add(job_stats)
+            return leases
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            for filename in filenames:
+                pending.append((filename, executor.submit(_parse_file, job(filename))))
+                if len(pending) >= 2 * workers:
+                    filename, future = pending.popleft()
+                    yield filename, result(future)
+            while pending:
+                filename, future = pending.popleft()
+                yield filename, result(future)
+
+    def get(self, include_backups=False, fields=None, where=None):
         """
         Parse the lease file and return a list of Lease instances.
+
+        With fields, a list of lease attribute names like ['ip', 'ethernet'], a list of namedtuples with only
+        those attributes is returned and only the properties they need are parsed from the lease blocks.
+
+        The where argument is a dict of predicates that all have to match for a lease to be returned, they
+        are checked on the lease block before the lease object is created:
+            ip              An address or a list of addresses
+            network         A network like "10.0.0.0/24" or a list of networks
+            binding_state   A binding state or a list of binding states
+            hardware        A hardware type like "ethernet" or a list of hardware types
+            ethernet        A prefix of the hardware address like an OUI "00:0c:29" or a list of prefixes
+            start_after     datetime, the lease started at or after it
+            start_before    datetime, the lease started at or before it
+            end_after       datetime, the lease ends at or after it
+            end_before      datetime, the lease ends at or before it
+        IPv6 leases have no start and hardware address, predicates on them don't match IPv6 leases.
+
+        In incremental mode only the blocks appended since the previous call are parsed, the
+        result is merged with the leases that were already parsed. In cache mode the leases from
+        the previous call are returned as long as the lease file hasn't changed.
+
+        With more than one worker the file is split on block boundaries and the parts are parsed
+        in a pool of worker processes, the leases are returned in the order of the file.
+        """
+        if fields is None and where is None:
+            if not self.incremental and not self.cache:
+                return self._get_all(include_backups)
+            with self._lock:
+                self._refresh()
+                return [lease for lease in self._leases if _included(lease, include_backups)]
+
+        where = _Where(where) if where is not None else None
+        if not self.incremental and not self.cache:
+            return list(self._select(include_backups, fields, where))
+
+        with self._lock:
+            self._refresh()
+            leases = [lease for lease in self._leases if _included(lease, include_backups) and
+                      (where is None or where.match(lease.ip, lease.data))]
+        if fields is None:
+            return leases
+        record = _record_type(fields)
+        return [record(*[getattr(lease, field, None) for field in fields]) for lease in leases]
+
+    def _select(self, include_backups, fields, where):
+        """
+        Parse the lease file and yield the leases that match where, as namedtuples of the fields if fields
+        is set. Only the properties that the predicates and fields need are parsed for the projection.
+        """
+        blocks = self._iter_all_blocks()
+        if fields is None:
+            for lease in self._parse_blocks(blocks, include_backups, where):
+                yield lease
+            return
+
+        record = _record_type(fields)
+        keys = set()
+        for field in fields:
+            if _field_keys.get(field) is None:
+                # Attributes like data and options need all properties
+                keys = None
+                break
+            keys.update(_field_keys[field])
+
+        stats = self.stats
+        for ip, lines, ia in blocks:
+            if ia is None and not include_backups and not any(line[:9] == 'hardware ' for line in lines):
+                if stats is not None:
+                    stats.skip('no hardware')
+                continue
+            if where is not None and not where.match(ip, _extract_keys(lines, where.keys)):
+                if stats is not None:
+                    stats.skip('where')
+                continue
+            if ia is None:
+                lease = LazyLease(ip, lines, now=self.now)
+            else:
+                lease = LazyLease6(ip, lines, ia[2], ia[1], ia[0], ia[3], now=self.now)
+            if stats is not None:
+                stats.leases += 1
+            if keys is not None:
+                lease.data = _extract_keys(lines, keys)
+            yield record(*[getattr(lease, field, None) for field in fields])
+
+    def _iter_all_blocks(self):
+        for lease_data, _ in self._iter_chunks(CHUNK_SIZE):
+            for block in self._tokenize(lease_data):
+                yield block
+
+    def poll_events(self):
+        """
+        Return the changes in the lease file since the previous call as a list of LeaseEvent tuples.
+        Leases can be granted, renewed, released, expired or moved to another address. The first call
+        returns a GRANTED event for every active lease.
+
+        Only the new blocks are compared with the previous block for their address, in incremental mode
+        that are the blocks appended since the previous call. Expiries come from a heap of end times.
+        """
+        now = self.now or datetime.datetime.utcnow().replace(tzinfo=utc)
+        with self._lock:
+            leases, _, self._events_cursor = self._changes(self._events_cursor)
+            events = self._events.feed([lease for lease in leases if _included(lease)])
+            events.extend(self._events.expire(_timestamp(now)))
+        return events
+
+    def _get_all(self, include_backups):
+        if self.workers > 1 and ProcessPoolExecutor is not None and self._opener() is None:
+            return self._get_parallel(include_backups)
+        return list(self.iter_leases(include_backups))
+
+    def invalidate(self):
+        """
+        Drop the maintained leases, the next call parses the lease file from the start again
+        """
+        with self._lock:
+            self._file_key = None
+            self._reset(None)
+
+    def _refresh(self):
+        """
+        Bring the maintained leases of the incremental and cache mode up to date with the lease file.
+        Nothing is parsed while the inode, size and modification time of the file are unchanged and the
+        leases are younger than cache_ttl seconds. Consumers that follow the changes use _changes().
+        """
+        with self._lock:
+            stat = os.stat(self.filename)
+            file_key = (stat.st_ino, stat.st_size, getattr(stat, 'st_mtime_ns', stat.st_mtime))
+            now = time.time()
+            if file_key == self._file_key and (self.cache_ttl is None or now - self._refreshed < self.cache_ttl):
+                return
+
+            if self.incremental:
+                self._update()
+            else:
+                self._reset(stat.st_ino)
+                self._leases = self._get_all(include_backups=True)
+                for lease in self._leases:
+                    self._latest[lease.ip] = lease
+
+            self._file_key = file_key
+            self._refreshed = now
+
+    def _changes(self, cursor=None, history=False):
         """
+        Parse the lease file for a consumer that follows it, like an index. In incremental and cache mode every
+        consumer keeps its own cursor into the maintained leases and gets the leases it hasn't seen yet, no
+        matter which other call parsed them. Otherwise the most recent lease for every address is returned.
+        :param cursor: the cursor returned by the previous call of the consumer, None for the first call
+        :param history: return every block in file order instead of the most recent leases when rebuilding
+        :return: tuple of the list of Lease instances, True if the consumer has to rebuild its state from them
+                 and the cursor for the next call
+        """
+        if not self.incremental and not self.cache:
+            if history:
+                return self.get(include_backups=True), True, None
+            return list(self.get_latest(include_backups=True).values()), True, None
+
+        with self._lock:
+            self._refresh()
+            if cursor is None or cursor[0] != self._generation:
+                leases, reset = list(self._leases if history else self._latest.values()), True
+            else:
+                leases, reset = self._leases[cursor[1]:], False
+            return leases, reset, (self._generation, len(self._leases))
+
+    def iter_leases(self, include_backups=False, chunk_size=CHUNK_SIZE):
+        """
+        Parse the lease file in chunks of chunk_size bytes and yield the Lease instances as soon as
+        their block is complete. Memory usage doesn't depend on the size of the lease file.
+        """
+        for lease_data, _ in self._iter_chunks(chunk_size):
+            for lease in self._parse(lease_data, include_backups):
+                yield lease
+
+    def _get_parallel(self, include_backups):
+        with open(self.filename, 'rb') as lease_file:
+            if not os.fstat(lease_file.fileno()).st_size:
+                return []
+            lease_map = mmap.mmap(lease_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                points = _split_points(lease_map, self.workers)
+            finally:
+                lease_map.close()
+
+        parts = [(self.filename, start, end, include_backups, self.now, self.lazy,
+                  ParseStats() if self.stats is not None else None)
+                 for start, end in zip(points, points[1:])]
         leases = []
-        with open(self.filename) if not self.gzip else gzip.open(self.filename) as lease_file:
-            lease_data = lease_file.read()
-            if self.gzip:
-                lease_data = lease_data.decode('utf-8')
-            for match in self.regex_leaseblock.finditer(lease_data):
-                block = match.groupdict()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for result, stats in executor.map(_parse_range, parts):
+                leases.extend(result)
+                if stats is not None:
+                    self.stats.add(stats)
+        return leases
 
-                properties, options, sets = _extract_properties(block['config'])
+    def to_table(self, include_backups=False, numpy=False):
+        """
+        Parse the lease file into a LeaseTable that stores every attribute of the leases as a column
+        of integers, as numpy arrays if numpy is True. No lease objects are created.
+        """
+        table = LeaseTable(numpy=numpy)
+        for lease_data, _ in self._iter_chunks(CHUNK_SIZE):
+            for ip, lines, ia in self._tokenize(lease_data):
+                properties, _, _ = self._extract(lines)
+                if ia is None:
+                    if 'hardware' not in properties and not include_backups:
+                        if self.stats is not None:
+                            self.stats.skip('no hardware')
+                        continue
+                    table.append(ip, _parse_hardware(properties)[1], _parse_epoch(properties.get('starts')),
+                                 _parse_epoch(properties.get('ends')), _parse_epoch(properties.get('cltt')),
+                                 _parse_binding_state(properties), _parse_hostname(properties))
+                else:
+                    table.append(ip, None, None, _parse_epoch(properties.get('ends')), _parse_epoch(ia[2]),
+                                 _parse_binding_state(properties), '')
+        return table.finish()
+
+    def _iter_chunks(self, chunk_size, offset=0):
+        """
+        Read the lease file from offset and yield the decoded data in pieces that end on a block boundary
+        :return: iterator of tuples of the data and the file offset of its end
+        """
+        if self.stats is None:
+            return self._read_chunks(chunk_size, offset)
+        return self._measured_chunks(chunk_size, offset)
+
+    def _read_chunks(self, chunk_size, offset):
+        opener = self._opener()
+        if opener is not None:
+            for chunk in self._iter_compressed_chunks(opener, chunk_size):
+                yield chunk
+            return
+
+        with open(self.filename, 'rb') as lease_file:
+            if os.fstat(lease_file.fileno()).st_size <= offset:
+                return
+            # The mapping is backed by the page cache, only the pieces being parsed are copied
+            lease_map = mmap.mmap(lease_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for chunk in _iter_mapped_chunks(lease_map, offset, chunk_size):
+                    yield chunk
+            finally:
+                lease_map.close()
+
+    def _opener(self):
+        """
+        :return: function that opens the lease file for reading the decompressed data or None for plain files
+        """
+        if self.gzip:
+            return gzip.open
+        return _compression(self.filename)
 
-                if 'hardware' not in properties and not include_backups:
-                    # E.g. rows like {'binding': 'state abandoned', ...}
+    def _iter_compressed_chunks(self, opener, chunk_size):
+        """
+        Decompress the lease file while reading it, only chunk_size bytes of decompressed data are kept
+        """
+        with opener(self.filename) as lease_file:
+            remainder = b''
+            offset = 0
+            while True:
+                data = lease_file.read(chunk_size)
+                if not data:
+                    break
+                data = remainder + data
+                end = data.rfind(b'\n}')
+                if end == -1:
+                    remainder = data
                     continue
-                lease = Lease(block['ip'], properties=properties, options=options, sets=sets, now=self.now)
-                leases.append(lease)
+                end += 2
+                offset += end
+                yield data[:end].decode('utf-8'), offset
+                remainder = data[end:]
 
-            for match in self.regex_leaseblock6.finditer(lease_data):
-                block = match.groupdict()
-                properties, options, sets = _extract_properties(block['config'])
+    def _update(self):
+        """
+        Parse the blocks appended to the lease file since the previous call and add them to the
+        maintained state. The state is rebuilt from scratch when dhcpd has rewritten or rotated the file.
+        """
+        stat = os.stat(self.filename)
+        # The offset in a compressed file can't be used to continue reading, it is parsed from the start
+        reset = stat.st_ino != self._inode or stat.st_size < self._offset or self._opener() is not None
 
-                host_identifier = block['id']
-                block_type = block['type']
-                last_client_communication = parse_time(properties['cltt'])
+        if self._offset and not reset:
+            # Make sure the file still ends the last block where we left off, if not it has been
+            # rewritten in place
+            with open(self.filename, 'rb') as lease_file:
+                lease_file.seek(self._offset - 2)
+                reset = lease_file.read(2) != b'\n}'
 
-                for address_block in self.regex_iaaddr.finditer(block['config']):
-                    block = address_block.groupdict()
-                    properties, options, sets = _extract_properties(block['config'])
+        if reset:
+            self._reset(stat.st_ino)
 
-                    lease = Lease6(block['ip'], properties, last_client_communication, host_identifier, block_type,
-                                   options=options, sets=sets, now=self.now)
-                    leases.append(lease)
+        # Only parse up to the last complete block, dhcpd might still be writing the rest
+        leases = []
+        for lease_data, end in self._iter_chunks(CHUNK_SIZE, self._offset):
+            leases.extend(self._parse(lease_data, include_backups=True))
+            self._offset = end
+        self._leases.extend(leases)
+        for lease in leases:
+            self._latest[lease.ip] = lease
+
+    def save_snapshot(self, filename):
+        """
+        Save the leases maintained in incremental mode to a binary snapshot file. After a restart
+        load_snapshot() restores them, so only the blocks appended to the lease file since are parsed.
+        """
+        if not self.incremental:
+            raise ValueError("Snapshots need an IscDhcpLeases instance in incremental mode")
+
+        with self._lock:
+            self._refresh()
+            blocks = []
+            for lease in self._leases:
+                ip, lines, ia = _lease_block(lease)
+                if ia is None:
+                    fields = (lease.ethernet, lease.start_epoch, lease.end_epoch,
+                              _parse_epoch(lease.data.get('cltt')))
+                else:
+                    fields = (None, None, lease.end_epoch, lease.last_communication_epoch)
+                blocks.append((ip, lines, ia) + fields + (lease.binding_state,))
+            write_snapshot(filename, blocks, self._inode, self._offset)
+
+    def load_snapshot(self, filename):
+        """
+        Restore the leases saved with save_snapshot(), the next call only parses the blocks appended to the
+        lease file after the snapshot was saved. Nothing is restored when the lease file has been replaced
+        or truncated since, the whole lease file is parsed again then.
+        The restored leases are lazy leases, also when lazy isn't set: the binding state and the times come
+        from the records of the snapshot and the statements are only parsed when another field is accessed.
+        :return: True if the snapshot was restored
+        """
+        if not self.incremental:
+            raise ValueError("Snapshots need an IscDhcpLeases instance in incremental mode")
+
+        with LeaseSnapshot(filename) as snapshot:
+            stat = os.stat(self.filename)
+            if stat.st_ino != snapshot.inode or stat.st_size < snapshot.offset:
+                return False
+            with self._lock:
+                self._reset(snapshot.inode)
+                self._leases = [self._restore_lease(*entry) for entry in snapshot.entries()]
+                for lease in self._leases:
+                    self._latest[lease.ip] = lease
+                self._offset = snapshot.offset
+                self._file_key = None
+        return True
+
+    def _restore_lease(self, ip, lines, ia, start, end, cltt, binding_state):
+        """
+        Create the lease object for a block from a snapshot with the fixed fields from its record
+        """
+        if ia is None:
+            lease = LazyLease(ip, lines, now=self.now)
+            lease.start = _from_epoch(start)
+        else:
+            lease = LazyLease6(ip, lines, ia[2], ia[1], ia[0], ia[3], now=self.now)
+            lease.last_communication = _from_epoch(cltt)
+        lease.end = _from_epoch(end)
+        lease.binding_state = _intern(binding_state, binding_state)
+        return lease
+
+    def _reset(self, inode):
+        self._leases = []
+        self._latest = {}
+        self._inode = inode
+        self._offset = 0
+        self._generation += 1
+
+    def get_latest(self, include_backups=False):
+        """
+        Parse the lease file and return a dict with only the most recent lease for every address.
+        The lease file is a journal, a block supersedes the earlier blocks for the same address.
+        The key for this dict is the ip address of the lease.
 
-        return leases
+        Superseded blocks are dropped while scanning, no lease objects are created for them.
+        """
+        if self.incremental or self.cache:
+            with self._lock:
+                self._refresh()
+                return dict((ip, lease) for ip, lease in iteritems(self._latest)
+                            if _included(lease, include_backups))
+
+        blocks = {}
+        count = 0
+        for lease_data, _ in self._iter_chunks(CHUNK_SIZE):
+            for ip, lines, ia in self._tokenize(lease_data):
+                blocks[ip] = (ip, lines, ia)
+                count += 1
+        if self.stats is not None:
+            self.stats.skip('superseded', count - len(blocks))
+        return dict((lease.ip, lease) for lease in self._parse_blocks(blocks.values(), include_backups))
+
+    def _parse(self, lease_data, include_backups=False):
+        """
+        Parse the lease blocks in lease_data and yield the Lease instances
+        """
+        return self._parse_blocks(self._tokenize(lease_data), include_backups)
+
+    def _parse_blocks(self, blocks, include_backups=False, where=None):
+        """
+        Create the Lease instances for the blocks from _iter_blocks, blocks that don't match where are skipped
+        """
+        for ip, lines, ia in blocks:
+            if where is not None and not where.match(ip, _extract_keys(lines, where.keys)):
+                if self.stats is not None:
+                    self.stats.skip('where')
+                continue
+            if self.lazy:
+                if include_backups or ia is not None or any(line[:9] == 'hardware ' for line in lines):
+                    yield self._construct(ip, lines, ia)
+                elif self.stats is not None:
+                    self.stats.skip('no hardware')
+                continue
+
+            properties, options, sets = self._extract(lines)
+            if ia is None and 'hardware' not in properties and not include_backups:
+                # E.g. rows like {'binding': 'state abandoned', ...}
+                if self.stats is not None:
+                    self.stats.skip('no hardware')
+                continue
+            yield self._construct(ip, lines, ia, properties, options, sets)
+
+    def _create_lease(self, ip, lines, ia, properties=None, options=None, sets=None):
+        """
+        Create the lease object for a block from _iter_blocks, the properties are only used for eager leases
+        """
+        if self.lazy:
+            if ia is None:
+                return LazyLease(ip, lines, now=self.now)
+            return LazyLease6(ip, lines, ia[2], ia[1], ia[0], ia[3], now=self.now)
+
+        if ia is None:
+            return Lease(ip, properties=properties, options=options, sets=sets, now=self.now)
+        block_type, host_identifier, cltt, quoted = ia
+        return Lease6(ip, properties, parse_time(cltt), host_identifier, block_type, quoted,
+                      options=options, sets=sets, now=self.now)
 
     def get_current(self):
         """
         Parse the lease file and return a dict of active and valid Lease instances.
         The key for this dict is the ethernet address of the lease.
+
+        The current time is determined once for all leases, the validity of a lease is checked
+        before its lease object is created so no objects are created for leases that aren't current.
         """
-        all_leases = self.get()
+        now = self.now or datetime.datetime.utcnow().replace(tzinfo=utc)
+        if self.incremental or self.cache:
+            with self._lock:
+                self._refresh()
+                current = [lease for lease in self._leases
+                           if lease.active and _included(lease) and lease._valid_at(now)]
+        else:
+            current = self._iter_current(now)
+
         leases = {}
-        for lease in all_leases:
-            if lease.valid and lease.active:
-                if type(lease) is Lease:
-                    leases[lease.ethernet] = lease
-                elif type(lease) is Lease6:
-                    leases['%s-%s' % (lease.type, lease.host_identifier_string)] = lease
+        for lease in current:
+            if isinstance(lease, Lease6):
+                leases['%s-%s' % (lease.type, lease.host_identifier_string)] = lease
+            else:
+                leases[lease.ethernet] = lease
         return leases
 
+    def _iter_current(self, now):
+        """
+        Parse the lease file and yield the lease objects for the active leases that are valid at now
+        """
+        now = _timestamp(now)
+        stats = self.stats
+        for lease_data, _ in self._iter_chunks(CHUNK_SIZE):
+            for ip, lines, ia in self._tokenize(lease_data):
+                properties, options, sets = self._extract(lines)
+                if ia is None and 'hardware' not in properties:
+                    if stats is not None:
+                        stats.skip('no hardware')
+                    continue
+                if properties.get('binding') != 'state active':
+                    if stats is not None:
+                        stats.skip('not current')
+                    continue
+                start = _parse_epoch(properties.get('starts')) if ia is None else None
+                end = _parse_epoch(properties.get('ends'))
+                if start is not None and start > now or end is not None and end < now:
+                    if stats is not None:
+                        stats.skip('not current')
+                    continue
+                yield self._construct(ip, lines, ia, properties, options, sets)
+
+    def _measured_chunks(self, chunk_size, offset):
+        previous = offset if self._opener() is None else 0
+        for lease_data, end in self.stats.timed('read', self._read_chunks(chunk_size, offset)):
+            self.stats.bytes_read += end - previous
+            self.stats.chunks += 1
+            previous = end
+            yield lease_data, end
+
+    def _measured_tokenize(self, lease_data):
+        stats = self.stats
+        for ip, lines, ia in stats.timed('tokenize', _iter_blocks(lease_data, stats)):
+            stats.block('lease' if ia is None else 'ia-' + ia[0])
+            for line in lines:
+                # Statements in the block that the property parser skips
+                if line and line[0] != '#' and line[-1:] != ';' and '; #' not in line:
+                    stats.malformed_lines += 1
+            yield ip, lines, ia
+
+    def _measured_extract(self, lines):
+        started = _clock()
+        result = _extract_property_lines(lines)
+        self.stats.timings['properties'] += _clock() - started
+        return result
+
+    def _measured_construct(self, ip, lines, ia, properties=None, options=None, sets=None):
+        stats = self.stats
+        if properties is not None:
+            # Parse the times before the lease does, it finds them in the time cache then
+            started = _clock()
+            _parse_starts(properties)
+            _parse_ends(properties)
+            if ia is not None:
+                parse_time(ia[2])
+            stats.timings['times'] += _clock() - started
+
+        started = _clock()
+        lease = self._create_lease(ip, lines, ia, properties, options, sets)
+        stats.timings['construct'] += _clock() - started
+        stats.leases += 1
+        return lease
+
+
+def _included(lease, include_backups=False):
+    """
+    :return: False for IPv4 leases without a hardware address unless include_backups is set
+    """
+    # E.g. rows like {'binding': 'state abandoned', ...}
+    if include_backups or isinstance(lease, Lease6):
+        return True
+    if isinstance(lease, LazyLease):
+        # Without extracting the properties of the lease
+        return any(line[:9] == 'hardware ' for line in lease._lines)
+    return 'hardware' in lease.data
+
+
+def _lease_block(lease):
+    """
+    Recreate the block of a lease object as (ip, lines, ia) tuple like _iter_blocks()
+    """
+    lines = getattr(lease, '_lines', None)
+    if lines is None:
+        lines = [key + ' ' + value + ';' for key, value in iteritems(lease.data)]
+        lines.extend('option ' + key + ' ' + value + ';' for key, value in iteritems(lease.options))
+        lines.extend('set ' + key + ' = "' + value + '";' for key, value in iteritems(lease.sets))
+
+    if not isinstance(lease, Lease6):
+        return lease.ip, lines, None
+    if isinstance(lease, LazyLease6):
+        return lease.ip, lines, (lease.type, lease._host_identifier, lease._cltt, lease._quoted)
+    # Octal escapes like in the lease file
+    host_identifier = ''.join('\\%03o' % byte for byte in bytearray(lease.host_identifier))
+    return lease.ip, lines, (lease.type, host_identifier, 'epoch %d' % lease.last_communication_epoch, True)
+
+
+def _parse_binding_state(properties):
+    _, binding_state = properties['binding'].split(' ', 1)
+    return _intern(binding_state, binding_state)
+
+
+def _parse_starts(properties):
+    if 'starts' in properties:
+        return parse_time(properties['starts'])
+    return None
+
+
+def _parse_ends(properties):
+    if properties.get('ends', 'never') == 'never':
+        return None
+    return parse_time(properties['ends'])
+
+
+def _parse_hardware(properties):
+    """
+    :return: tuple of the hardware type and the hardware address or (None, None)
+    """
+    if 'hardware' in properties:
+        hardware = properties['hardware'].split(' ')
+        return _intern(hardware[0], hardware[0]), hardware[1]
+    return None, None
+
+
+def _parse_hostname(properties):
+    return properties.get('client-hostname', '').replace("\"", "")
+
+
+IDENTIFIER_CACHE_SIZE = 16384
+_identifier_cache = {}
+_colon_identifier_cache = {}
+_hex_cache = {}
+
+_octal_digits = frozenset('01234567')
+
+
+def _unescape(s):
+    """
+    Decode a string with octal escapes like "\\001\\000" and escaped characters like "\\"" to bytes
+    """
+    result = bytearray()
+    pos = 0
+    index = s.find('\\')
+    while index != -1:
+        result.extend(s[pos:index].encode('latin-1'))
+        end = index + 1
+        while end < index + 4 and s[end:end + 1] in _octal_digits:
+            end += 1
+        if end > index + 1:
+            result.append(int(s[index + 1:end], 8))
+        else:
+            result.extend(s[index + 1:index + 2].encode('latin-1'))
+            end = index + 2
+        pos = end
+        index = s.find('\\', pos)
+    result.extend(s[pos:].encode('latin-1'))
+    return bytes(result)
+
+
+def parse_host_identifier(s, quoted=True):
+    """
+    Parse the IAID and DUID of an IPv6 lease from the lease file to bytes, from the escaped string
+    in a quoted ia-* statement like "\\001\\000\\000\\000..." or, if quoted is False, from the colon
+    separated hex format like 01:00:00:00:... Results are cached, the same bytes object is returned for
+    the same client.
+    """
+    cache = _identifier_cache if quoted else _colon_identifier_cache
+    try:
+        return cache[s]
+    except KeyError:
+        pass
+
+    if quoted:
+        result = _unescape(s)
+    else:
+        result = bytes(bytearray(int(part, 16) for part in s.split(':')))
+
+    if len(cache) >= IDENTIFIER_CACHE_SIZE:
+        cache.clear()
+    cache[s] = result
+    return result
+
+
+def _hexlify(identifier):
+    try:
+        return _hex_cache[identifier]
+    except KeyError:
+        pass
+    result = binascii.hexlify(identifier).decode('ascii')
+    if len(_hex_cache) >= IDENTIFIER_CACHE_SIZE:
+        _hex_cache.clear()
+    _hex_cache[identifier] = result
+    return result
+
 
 class BaseLease(object):
     """
@@ -205,6 +1313,8 @@ class BaseLease(object):
         sets        Dict of key-value set statement values from this lease
     """
 
+    __slots__ = ('ip', 'data', 'options', 'sets', 'binding_state', '_now')
+
     def __init__(self, ip, properties, options=None, sets=None, now=None):
         check_datetime(now)
 
@@ -218,7 +1328,7 @@ class BaseLease(object):
         self.data = properties
         self.options = options
         self.sets = sets
-        _, self.binding_state = properties['binding'].split(' ', 1)
+        self.binding_state = _parse_binding_state(properties)
         self._now = now
 
     @property
@@ -229,6 +1339,13 @@ class BaseLease(object):
         """
         return self.binding_state == 'active'
 
+    @property
+    def end_epoch(self):
+        """
+        :return: int: end as seconds since the epoch or None if this is an infinite lease
+        """
+        return _to_epoch(self.end)
+
     @property
     def now(self):
         """
@@ -249,30 +1366,21 @@ class Lease(BaseLease):
         ethernet        The ethernet address of this lease (MAC address)
         start           The start time of this lease as DateTime object
         end             The time this lease expires as DateTime object or None if this is an infinite lease
+        start_epoch     The start time as seconds since the epoch
+        end_epoch       The end time as seconds since the epoch or None if this is an infinite lease
         hostname        The hostname for this lease if given by the client
         binding_state   The binding state as string ('active', 'free', 'abandoned', 'backup')
         data            Dict of all the info in the dhcpd.leases file for this lease
     """
 
+    __slots__ = ('start', 'end', 'hardware', 'ethernet', 'hostname')
+
     def __init__(self, ip, properties, **kwargs):
         super(Lease, self).__init__(ip, properties=properties, **kwargs)
-        if 'starts' in properties:
-            self.start = parse_time(properties['starts'])
-        else:
-            self.start = None
-        if properties.get('ends', 'never') == 'never':
-            self.end = None
-        else:
-            self.end = parse_time(properties['ends'])
-
-        if 'hardware' in properties:
-            self._hardware = properties['hardware'].split(' ')
-            self.ethernet = self._hardware[1]
-            self.hardware = self._hardware[0]
-        else:
-            self.hardware = None
-            self.ethernet = None
-        self.hostname = properties.get('client-hostname', '').replace("\"", "")
+        self.start = _parse_starts(properties)
+        self.end = _parse_ends(properties)
+        self.hardware, self.ethernet = _parse_hardware(properties)
+        self.hostname = _parse_hostname(properties)
 
     @property
     def valid(self):
@@ -280,16 +1388,26 @@ class Lease(BaseLease):
         Checks if the lease is currently valid (not expired and not in the future)
         :return: bool: True if lease is valid
         """
+        return self._valid_at(self.now)
+
+    @property
+    def start_epoch(self):
+        """
+        :return: int: start as seconds since the epoch or None
+        """
+        return _to_epoch(self.start)
+
+    def _valid_at(self, now):
         if self.end is None:
             if self.start is not None:
-                return self.start <= self.now
+                return self.start <= now
             else:
                 return True
         else:
             if self.start is not None:
-                return self.start <= self.now <= self.end
+                return self.start <= now <= self.end
             else:
-                return self.now <= self.end
+                return now <= self.end
 
     def __repr__(self):
         return "<Lease {} for {} ({})>".format(self.ip, self.ethernet, self.hostname)
@@ -310,6 +1428,7 @@ class Lease6(BaseLease):
         iaid               The Interface Association Identifier (IAID) of the host
         last_communication The last communication time with the host
         end                The time this lease expires as DateTime object or None if this is an infinite lease
+        end_epoch          The end time as seconds since the epoch or None if this is an infinite lease
         binding_state      The binding state as string ('active', 'free', 'abandoned', 'backup')
         preferred_life     The preferred lifetime in seconds
         max_life           The valid lifetime for this address in seconds
@@ -318,20 +1437,20 @@ class Lease6(BaseLease):
 
     (TEMPORARY, NON_TEMPORARY, PREFIX_DELEGATION) = ('ta', 'na', 'pd')
 
-    def __init__(self, ip, properties, cltt, host_identifier, address_type, **kwargs):
+    __slots__ = ('type', 'last_communication', 'host_identifier', 'iaid', 'duid', 'end', 'preferred_life',
+                 'max_life')
+
+    def __init__(self, ip, properties, cltt, host_identifier, address_type, quoted=True, **kwargs):
         super(Lease6, self).__init__(ip, properties=properties, **kwargs)
 
         self.type = address_type
         self.last_communication = cltt
 
-        self.host_identifier = self._iaid_duid_to_bytes(host_identifier)
+        self.host_identifier = self._iaid_duid_to_bytes(host_identifier, quoted)
         self.iaid = struct.unpack('<I', self.host_identifier[0:4])[0]
         self.duid = self.host_identifier[4:]
 
-        if properties.get('ends', 'never') == 'never':
-            self.end = None
-        else:
-            self.end = parse_time(properties['ends'])
+        self.end = _parse_ends(properties)
 
         self.preferred_life = int(properties['preferred-life'])
         self.max_life = int(properties['max-life'])
@@ -341,7 +1460,7 @@ class Lease6(BaseLease):
         """
         Return the host_identifier as a hexidecimal ascii string
         """
-        return binascii.hexlify(self.host_identifier).decode('ascii')
+        return _hexlify(self.host_identifier)
 
     @property
     def valid(self):
@@ -349,10 +1468,20 @@ class Lease6(BaseLease):
         Checks if the lease is currently valid (not expired)
         :return: bool: True if lease is valid
         """
+        return self._valid_at(self.now)
+
+    @property
+    def last_communication_epoch(self):
+        """
+        :return: int: last_communication as seconds since the epoch
+        """
+        return _to_epoch(self.last_communication)
+
+    def _valid_at(self, now):
         if self.end is None:
             return True
         else:
-            return self.now <= self.end
+            return now <= self.end
 
     def __repr__(self):
         return "<Lease6 {}>".format(self.ip)
@@ -360,16 +1489,94 @@ class Lease6(BaseLease):
     def __eq__(self, other):
         return self.ip == other.ip and self.host_identifier == other.host_identifier
 
-    def _iaid_duid_to_bytes(self, input_string):
+    def _iaid_duid_to_bytes(self, input_string, quoted=True):
         """
-        Parse the IAID_DUID from dhcpd.leases to the bytes representation
-
-        This method doesn't support the colon separated hex format yet.
+        Parse the IAID_DUID from dhcpd.leases to the bytes representation, see parse_host_identifier()
         """
-        result = codecs.decode(input_string, 'unicode_escape').encode('latin-1')
+        return parse_host_identifier(input_string, quoted)
+
+
+class _LazyLeaseMixin(object):
+    """
+    Materialises the attributes listed in _lazy_attributes from the raw lease block on first access
+    """
+
+    __slots__ = ()
+
+    _lazy_attributes = {
+        'data': lambda lease: lease._extract()[0],
+        'options': lambda lease: lease._extract()[1],
+        'sets': lambda lease: lease._extract()[2],
+        'binding_state': lambda lease: _parse_binding_state(lease.data),
+        'end': lambda lease: _parse_ends(lease.data),
+    }
+
+    def __getattr__(self, name):
+        # Only called when the attribute hasn't been set yet
+        try:
+            parse = self._lazy_attributes[name]
+        except KeyError:
+            raise AttributeError(name)
+        value = parse(self)
+        setattr(self, name, value)
+        return value
+
+    def _extract(self):
+        result = _extract_property_lines(self._lines)
+        self.data, self.options, self.sets = result
         return result
 
 
+class LazyLease(_LazyLeaseMixin, Lease):
+    """
+    IPv4 lease that keeps the statements from its lease block and only parses a field when it's
+    accessed for the first time. It has the same attributes as Lease.
+    """
+
+    __slots__ = ('_lines',)
+
+    _lazy_attributes = dict(_LazyLeaseMixin._lazy_attributes, **{
+        'start': lambda lease: _parse_starts(lease.data),
+        'hardware': lambda lease: _parse_hardware(lease.data)[0],
+        'ethernet': lambda lease: _parse_hardware(lease.data)[1],
+        'hostname': lambda lease: _parse_hostname(lease.data),
+    })
+
+    def __init__(self, ip, lines, now=None):
+        check_datetime(now)
+        self.ip = ip
+        self._lines = lines
+        self._now = now
+
+
+class LazyLease6(_LazyLeaseMixin, Lease6):
+    """
+    IPv6 lease that keeps the statements from its iaaddr or iaprefix block and only parses a field
+    when it's accessed for the first time. It has the same attributes as Lease6.
+    """
+
+    __slots__ = ('_lines', '_cltt', '_host_identifier', '_quoted')
+
+    _lazy_attributes = dict(_LazyLeaseMixin._lazy_attributes, **{
+        'last_communication': lambda lease: parse_time(lease._cltt),
+        'host_identifier': lambda lease: lease._iaid_duid_to_bytes(lease._host_identifier, lease._quoted),
+        'iaid': lambda lease: struct.unpack('<I', lease.host_identifier[0:4])[0],
+        'duid': lambda lease: lease.host_identifier[4:],
+        'preferred_life': lambda lease: int(lease.data['preferred-life']),
+        'max_life': lambda lease: int(lease.data['max-life']),
+    })
+
+    def __init__(self, ip, lines, cltt, host_identifier, address_type, quoted=True, now=None):
+        check_datetime(now)
+        self.ip = ip
+        self.type = address_type
+        self._lines = lines
+        self._cltt = cltt
+        self._host_identifier = host_identifier
+        self._quoted = quoted
+        self._now = now
+
+
 if __name__ == "__main__":  # pragma: no cover
     leases = IscDhcpLeases('dhcpd.leases')
     print(leases.get_current())
@@ -0,0 +1,167 @@
+import bisect
+import re
+import socket
+import struct
+from collections import namedtuple
+
+import six
+
+from .iscdhcpleases import CHUNK_SIZE, _intern
+from .table import ip_to_int, network_range
+
+Pool = namedtuple('Pool', ['name', 'first', 'last', 'size'])
+Pool.__doc__ = """
+Range of addresses or delegated prefixes that dhcpd hands out leases from
+
+    name    Description of the pool, like "10.0.0.10-10.0.0.100" or "2001:db8::/64"
+    first   The first address of the pool
+    last    The last address of the pool
+    size    The number of addresses or prefixes in the pool
+"""
+
+PoolUsage = namedtuple('PoolUsage', ['pool', 'counts'])
+PoolUsage.__doc__ = """
+Usage of a pool
+
+    pool    Pool tuple
+    counts  Dict with the number of leases in the pool for every binding state
+"""
+
+_comment = re.compile(r'#[^\n]*')
+
+
+def _network(network):
+    """
+    :return: tuple of the first and last address of a network like "10.0.0.0/24" as strings
+    """
+    first, last = network_range(network)
+    return _int_to_ip(*first), _int_to_ip(*last)
+
+
+def _int_to_ip(family, address):
+    if family == 4:
+        return socket.inet_ntoa(struct.pack('>I', address))
+    return socket.inet_ntop(socket.AF_INET6, struct.pack('>QQ', address >> 64, address & 0xffffffffffffffff))
+
+
+def _range(name, first, last, prefix_length=None):
+    first_int = ip_to_int(first)[1]
+    last_int = ip_to_int(last)[1]
+    size = last_int - first_int + 1
+    if prefix_length is not None:
+        size = ((last_int - first_int) >> (128 - prefix_length)) + 1
+    return Pool(name, first, last, size)
+
+
+def parse_pool(pool):
+    """
+    Parse a pool like "10.0.0.0/24", "10.0.0.10-10.0.0.100" or "2001:db8::/64" into a Pool tuple
+    """
+    if '-' in pool:
+        first, last = pool.split('-')
+        return _range(pool, first.strip(), last.strip())
+    return _range(pool, *_network(pool))
+
+
+def parse_dhcpd_conf(data):
+    """
+    Find the pools in the contents of a dhcpd.conf file, these are the range, range6 and prefix6 statements
+    :return: list of Pool tuples in the order of the file
+    """
+    pools = []
+    for statement in re.split(r'[;{}]', _comment.sub('', data)):
+        words = statement.split()
+        if not words:
+            continue
+        if words[0] == 'range':
+            # range [dynamic-bootp] low-address [high-address];
+            addresses = [word for word in words[1:] if word != 'dynamic-bootp']
+            pools.append(_range('-'.join(addresses), addresses[0], addresses[-1]))
+        elif words[0] == 'range6':
+            # range6 low-address high-address; range6 subnet6-number [temporary];
+            if '/' in words[1]:
+                pools.append(_range(words[1], *_network(words[1])))
+            else:
+                pools.append(_range(words[1] + '-' + words[2], words[1], words[2]))
+        elif words[0] == 'prefix6':
+            # prefix6 low-address high-address / bits;
+            prefix_length = int(''.join(words[3:]).lstrip('/'))
+            pools.append(_range('{}-{}/{}'.format(words[1], words[2], prefix_length), words[1], words[2],
+                                prefix_length))
+    return pools
+
+
+def read_dhcpd_conf(filename):
+    """
+    Find the pools in a dhcpd.conf file
+    :return: list of Pool tuples in the order of the file
+    """
+    with open(filename) as conf_file:
+        return parse_dhcpd_conf(conf_file.read())
+
+
+def _binding_state(lines):
+    for line in lines:
+        if line[:14] == 'binding state ':
+            state = line[14:-1]
+            return _intern(state, state)
+    return None
+
+
+class PoolCounter(object):
+    """
+    Counts the leases in every pool by binding state. Only the most recent block for every address is
+    counted, the blocks are bucketed with a binary search on the sorted pool ranges. The pools must not
+    overlap.
+    """
+
+    def __init__(self, pools):
+        """
+        :param pools: list of Pool tuples or strings like "10.0.0.0/24" and "10.0.0.10-10.0.0.100"
+        """
+        self.pools = [parse_pool(pool) if isinstance(pool, six.string_types) else pool for pool in pools]
+        # Sorted list of the (family, first, last, index of the pool) tuples
+        ranges = sorted((ip_to_int(pool.first)[0], ip_to_int(pool.first)[1], ip_to_int(pool.last)[1], index)
+                        for index, pool in enumerate(self.pools))
+        self._starts = [(family, first) for family, first, _, _ in ranges]
+        self._ranges = ranges
+
+    @classmethod
+    def from_dhcpd_conf(cls, filename):
+        return cls(read_dhcpd_conf(filename))
+
+    def lookup(self, ip):
+        """
+        :return: the index of the pool that contains the address or None
+        """
+        family, address, _ = ip_to_int(ip)
+        position = bisect.bisect_right(self._starts, (family, address)) - 1
+        if position < 0:
+            return None
+        range_family, _, last, index = self._ranges[position]
+        if range_family != family or address > last:
+            return None
+        return index
+
+    def count(self, leases):
+        """
+        Count the leases of an IscDhcpLeases instance in the pools. The lease file is scanned without
+        creating lease objects, in incremental and cache mode the maintained leases are counted instead.
+        :return: list of PoolUsage tuples in the order of the pools
+        """
+        if leases.incremental or leases.cache:
+            with leases._lock:
+                leases._refresh()
+                states = dict((ip, lease.binding_state) for ip, lease in six.iteritems(leases._latest))
+        else:
+            states = {}
+            for lease_data, _ in leases._iter_chunks(CHUNK_SIZE):
+                for ip, lines, _ in leases._tokenize(lease_data):
+                    states[ip] = _binding_state(lines)
+
+        counts = [{} for _ in self.pools]
+        for ip, state in six.iteritems(states):
+            index = self.lookup(ip)
+            if index is not None and state is not None:
+                counts[index][state] = counts[index].get(state, 0) + 1
+        return [PoolUsage(pool, pool_counts) for pool, pool_counts in zip(self.pools, counts)]
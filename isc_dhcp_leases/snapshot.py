@@ -0,0 +1,132 @@
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+from .table import BINDING_STATES, MISSING, NEVER, mac_to_int
+
+MAGIC = b'DHCPSNAP'
+VERSION = 2
+
+# magic, version, number of records, inode and offset of the lease file, length of the binding state names
+_header = struct.Struct('<8sHIQQI')
+
+# family, binding state, ia type, 1 if the host identifier is quoted, mac, start, end, cltt, offset and length
+# of the block text in the pool
+_record = struct.Struct('<BBBBQqqqQI')
+
+# The ia type of IPv4 leases and the types of the IPv6 ia-* blocks
+_ia_types = (None, 'na', 'ta', 'pd')
+
+SnapshotRecord = namedtuple('SnapshotRecord', ['ip', 'mac', 'start', 'end', 'cltt', 'binding_state'])
+SnapshotRecord.__doc__ = """
+Fixed fields of a lease in a snapshot, the times are in seconds since the epoch or None
+
+    ip              The address of the lease
+    mac             The hardware address as integer, 0 for leases without one
+    start           The start of the lease
+    end             The end of the lease or None if this is an infinite lease
+    cltt            The last communication with the client
+    binding_state   The binding state as string
+"""
+
+
+def write_snapshot(filename, blocks, inode, offset):
+    """
+    Write the blocks to a snapshot file, the file is replaced atomically
+    :param blocks: list of (ip, lines, ia, ethernet, start, end, cltt, binding_state) tuples, ia is None for
+                   IPv4 leases and (type, host_identifier, cltt, quoted) for IPv6 leases like from _iter_blocks()
+    :param inode: inode of the lease file the blocks were parsed from
+    :param offset: offset of the end of the last parsed block in the lease file
+    """
+    binding_states = list(BINDING_STATES)
+    records = []
+    texts = []
+    pool_size = 0
+    for ip, lines, ia, ethernet, start, end, cltt, binding_state in blocks:
+        if binding_state not in binding_states:
+            binding_states.append(binding_state)
+        if ia is None:
+            text = '\n'.join([ip, '', ''] + lines)
+        else:
+            text = '\n'.join([ip, ia[1], ia[2] or ''] + lines)
+        text = text.encode('utf-8')
+        records.append(_record.pack(6 if ':' in ip else 4, binding_states.index(binding_state),
+                                    _ia_types.index(ia[0] if ia is not None else None),
+                                    ia is not None and ia[3], mac_to_int(ethernet),
+                                    MISSING if start is None else start, NEVER if end is None else end,
+                                    MISSING if cltt is None else cltt, pool_size, len(text)))
+        texts.append(text)
+        pool_size += len(text)
+
+    states = '\n'.join(binding_states).encode('utf-8')
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb') as snapshot_file:
+        snapshot_file.write(_header.pack(MAGIC, VERSION, len(records), inode, offset, len(states)))
+        snapshot_file.write(b''.join(records))
+        snapshot_file.write(states)
+        snapshot_file.write(b''.join(texts))
+    getattr(os, 'replace', os.rename)(temporary, filename)
+
+
+class LeaseSnapshot(object):
+    """
+    Memory-mapped reader for a snapshot written by write_snapshot(). The snapshot has a header with the
+    inode and offset of the lease file, a fixed-width record with the address family, binding state, mac,
+    start, end and cltt of every lease and a pool with the address and the statements of every block.
+    Reading a record only touches its own bytes.
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as snapshot_file:
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, self.inode, self.offset, states_length = _header.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("{} is not a lease snapshot of version {}".format(filename, VERSION))
+        states_offset = _header.size + self._count * _record.size
+        self.binding_states = self._map[states_offset:states_offset + states_length].decode('utf-8').split('\n')
+        self._pool = states_offset + states_length
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _unpack(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return _record.unpack_from(self._map, _header.size + index * _record.size)
+
+    def _text(self, offset, length):
+        start = self._pool + offset
+        return self._map[start:start + length].decode('utf-8').split('\n')
+
+    def record(self, index):
+        """
+        :return: SnapshotRecord with the fixed fields of a lease
+        """
+        _, binding_state, _, _, mac, start, end, cltt, offset, _ = self._unpack(index)
+        start_of_ip = self._pool + offset
+        ip = self._map[start_of_ip:self._map.find(b'\n', start_of_ip)].decode('utf-8')
+        return SnapshotRecord(ip, mac, None if start == MISSING else start, None if end == NEVER else end,
+                              None if cltt == MISSING else cltt, self.binding_states[binding_state])
+
+    def entries(self):
+        """
+        Yield the blocks in the order they were written with the fixed fields of their record as
+        (ip, lines, ia, start, end, cltt, binding_state) tuples, the times are in seconds since the epoch or None
+        """
+        for index in range(self._count):
+            _, binding_state, ia_type, quoted, _, start, end, cltt, offset, length = self._unpack(index)
+            text = self._text(offset, length)
+            ia = None if ia_type == 0 else (_ia_types[ia_type], text[1], text[2], bool(quoted))
+            yield (text[0], text[3:], ia, None if start == MISSING else start, None if end == NEVER else end,
+                   None if cltt == MISSING else cltt, self.binding_states[binding_state])
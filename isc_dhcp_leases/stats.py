@@ -0,0 +1,86 @@
+import time
+
+# Monotonic high resolution clock, time.time on Python 2
+_clock = getattr(time, 'perf_counter', time.time)
+
+# The stages of the parse pipeline in the order a block passes them
+STAGES = ('read', 'tokenize', 'properties', 'times', 'construct')
+
+
+class ParseStats(object):
+    """
+    Counters and timings of the parse pipeline, pass an instance as the stats argument of IscDhcpLeases to
+    collect them. Every parse of the lease file adds to the counters until reset() is called.
+
+        bytes_read      Bytes of lease data read, after decompression
+        chunks          Number of pieces the lease data was read in
+        blocks          Dict with the number of blocks by type, 'lease' for IPv4 leases, 'ia-na', 'ia-ta' and
+                        'ia-pd' for every address or prefix in an IPv6 block and the first word of other
+                        declarations like 'failover' and 'host', which are skipped by the tokenizer
+        skipped         Dict with the number of lease blocks that didn't become a lease object by reason:
+                        'no hardware' for blocks without hardware address when backups aren't included,
+                        'where' for blocks that don't match the where argument of get(), 'superseded'
+                        for blocks replaced by a later block in get_latest() and 'not current' for
+                        blocks that aren't active and valid in get_current()
+        malformed_lines Number of lines that aren't a statement, a declaration, a brace or a comment
+        leases          Number of lease objects created
+        timings         Dict with the seconds spent in every stage: 'read' for reading and decoding the
+                        file, 'tokenize' for splitting it into blocks, 'properties' for parsing the
+                        statements of a block, 'times' for parsing the start, end and cltt times and
+                        'construct' for creating the lease objects
+
+    Lazy leases parse their properties and times on first access, which isn't part of the pipeline.
+    The counters aren't synchronized, share an instance between threads only in incremental or cache mode.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.bytes_read = 0
+        self.chunks = 0
+        self.blocks = {}
+        self.skipped = {}
+        self.malformed_lines = 0
+        self.leases = 0
+        self.timings = dict((stage, 0.0) for stage in STAGES)
+
+    def block(self, block_type):
+        self.blocks[block_type] = self.blocks.get(block_type, 0) + 1
+
+    def skip(self, reason, count=1):
+        self.skipped[reason] = self.skipped.get(reason, 0) + count
+
+    def timed(self, stage, iterable):
+        """
+        Yield the items of iterable, the time spent producing them is added to the stage
+        """
+        iterator = iter(iterable)
+        while True:
+            start = _clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.timings[stage] += _clock() - start
+                return
+            self.timings[stage] += _clock() - start
+            yield item
+
+    def add(self, other):
+        """
+        Add the counters and timings of another ParseStats instance, e.g. from a worker process
+        """
+        self.bytes_read += other.bytes_read
+        self.chunks += other.chunks
+        for block_type, count in other.blocks.items():
+            self.blocks[block_type] = self.blocks.get(block_type, 0) + count
+        for reason, count in other.skipped.items():
+            self.skip(reason, count)
+        self.malformed_lines += other.malformed_lines
+        self.leases += other.leases
+        for stage, seconds in other.timings.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def __repr__(self):
+        return '<ParseStats {} bytes, {} leases, {} skipped, {} malformed lines>'.format(
+            self.bytes_read, self.leases, sum(self.skipped.values()), self.malformed_lines)
@@ -0,0 +1,202 @@
+import array
+import datetime
+import socket
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Lower bound used for leases without a start time and upper bound used for leases that never end
+MISSING = -2 ** 63
+NEVER = 2 ** 63 - 1
+
+BINDING_STATES = ('free', 'active', 'expired', 'released', 'abandoned', 'reset', 'backup', 'reserved', 'bootp')
+
+_epoch = datetime.datetime(1970, 1, 1)
+
+try:
+    array.array('q')
+    _has_64_bit = True
+except ValueError:
+    # The 64 bit typecodes only exist since Python 3.3, Python 2 stores those columns in lists
+    _has_64_bit = False
+
+# numpy types of the columns that can be lists
+_numpy_types = {'q': 'int64', 'Q': 'uint64'}
+
+
+def _column(typecode):
+    if typecode in _numpy_types and not _has_64_bit:
+        return []
+    return array.array(typecode)
+
+
+def ip_to_int(ip):
+    """
+    Convert an IPv4 or IPv6 address (optionally with a /prefix) to an integer
+    :return: tuple of the address family (4 or 6), the address as int and the prefix length
+    """
+    if '/' in ip:
+        ip, prefix_length = ip.split('/')
+        prefix_length = int(prefix_length)
+    else:
+        prefix_length = None
+
+    if ':' in ip:
+        high, low = struct.unpack('>QQ', socket.inet_pton(socket.AF_INET6, ip))
+        return 6, high << 64 | low, 128 if prefix_length is None else prefix_length
+    return 4, struct.unpack('>I', socket.inet_aton(ip))[0], 32 if prefix_length is None else prefix_length
+
+
+def network_range(network):
+    """
+    :return: tuple of the first and last address of a network like "10.4.0.0/16" as (family, int) tuples
+    """
+    family, address, prefix_length = ip_to_int(network)
+    bits = 32 if family == 4 else 128
+    host_mask = (1 << (bits - prefix_length)) - 1
+    first = address & ~host_mask
+    return (family, first), (family, first | host_mask)
+
+
+def mac_to_int(mac):
+    """
+    Convert a hardware address like "60:a4:4c:b5:6a:dd" to an integer
+    :return: int or 0 for missing addresses and addresses that don't fit in 64 bits
+    """
+    if not mac:
+        return 0
+    value = mac.replace(':', '')
+    if len(value) > 16:
+        return 0
+    return int(value, 16)
+
+
+def int_to_mac(value):
+    digits = '%012x' % value
+    return ':'.join(digits[i:i + 2] for i in range(0, len(digits), 2))
+
+
+class LeaseTable(object):
+    """
+    Columnar representation of the leases in a lease file, every attribute is a column with a
+    value for every lease:
+
+        family          The address family, 4 or 6
+        ip              The IPv4 address as unsigned 32 bit integer, 0 for IPv6 leases
+        ip6_high        The upper 64 bits of the IPv6 address, 0 for IPv4 leases
+        ip6_low         The lower 64 bits of the IPv6 address, 0 for IPv4 leases
+        prefix_length   The prefix length, 32 for IPv4 and 128 for IPv6 addresses
+        mac             The hardware address as unsigned 64 bit integer, 0 if the lease doesn't have one
+        start           Start of the lease in seconds since the epoch, MISSING if the lease doesn't have one
+        end             End of the lease in seconds since the epoch, NEVER for infinite leases
+        cltt            Last client communication in seconds since the epoch, MISSING if unknown
+        binding_state   Index of the binding state in binding_states
+
+    The hostnames are stored in one utf-8 encoded bytes pool, hostname_offsets holds the start
+    offset of every hostname and the end offset of the last one. Use hostname(index) to get one.
+
+    When numpy is True the columns are numpy arrays, otherwise they are array.array instances. On Python 2
+    the 64 bit columns are lists of ints.
+    """
+
+    _columns = (('family', 'B'), ('ip', 'I'), ('ip6_high', 'Q'), ('ip6_low', 'Q'), ('prefix_length', 'B'),
+                ('mac', 'Q'), ('start', 'q'), ('end', 'q'), ('cltt', 'q'), ('binding_state', 'B'))
+
+    def __init__(self, numpy=False):
+        self.numpy = numpy
+        self.binding_states = list(BINDING_STATES)
+        for name, typecode in self._columns:
+            setattr(self, name, _column(typecode))
+        self.hostname_offsets = array.array('I', [0])
+        self.hostname_data = b''
+        self._hostnames = []
+        self._hostname_size = 0
+
+    def __len__(self):
+        return len(self.family)
+
+    def append(self, ip, mac, start, end, cltt, binding_state, hostname):
+        """
+        Add a lease to the table, the times are in seconds since the epoch or None
+        """
+        family, address, prefix_length = ip_to_int(ip)
+        self.family.append(family)
+        if family == 4:
+            self.ip.append(address)
+            self.ip6_high.append(0)
+            self.ip6_low.append(0)
+        else:
+            self.ip.append(0)
+            self.ip6_high.append(address >> 64)
+            self.ip6_low.append(address & 0xffffffffffffffff)
+        self.prefix_length.append(prefix_length)
+        self.mac.append(mac_to_int(mac))
+        self.start.append(MISSING if start is None else start)
+        self.end.append(NEVER if end is None else end)
+        self.cltt.append(MISSING if cltt is None else cltt)
+
+        try:
+            self.binding_state.append(self.binding_states.index(binding_state))
+        except ValueError:
+            self.binding_states.append(binding_state)
+            self.binding_state.append(len(self.binding_states) - 1)
+
+        hostname = hostname.encode('utf-8')
+        self._hostnames.append(hostname)
+        self._hostname_size += len(hostname)
+        self.hostname_offsets.append(self._hostname_size)
+
+    def finish(self):
+        """
+        Join the hostname pool and convert the columns to numpy arrays if requested
+        """
+        self.hostname_data = self.hostname_data + b''.join(self._hostnames)
+        self._hostnames = []
+        if self.numpy:
+            if numpy is None:
+                raise ImportError('numpy is required for LeaseTable(numpy=True)')
+            for name, typecode in self._columns + (('hostname_offsets', 'I'),):
+                column = getattr(self, name)
+                if not isinstance(column, numpy.ndarray):
+                    setattr(self, name, numpy.array(column, dtype=_numpy_types.get(typecode)))
+        return self
+
+    def hostname(self, index):
+        return self.hostname_data[self.hostname_offsets[index]:self.hostname_offsets[index + 1]].decode('utf-8')
+
+    def ip_string(self, index):
+        if self.family[index] == 4:
+            return socket.inet_ntoa(struct.pack('>I', self.ip[index]))
+        ip = socket.inet_ntop(socket.AF_INET6, struct.pack('>QQ', self.ip6_high[index], self.ip6_low[index]))
+        if self.prefix_length[index] != 128:
+            ip += '/%d' % self.prefix_length[index]
+        return ip
+
+    def valid(self, now=None):
+        """
+        Evaluate Lease.valid for all leases at once
+        :param now: offset-aware datetime or seconds since the epoch, defaults to the current time
+        :return: numpy bool array or list of bools
+        """
+        if now is None:
+            now = datetime.datetime.utcnow()
+        if isinstance(now, datetime.datetime):
+            now = int((now.replace(tzinfo=None) - (now.utcoffset() or datetime.timedelta(0)) - _epoch)
+                      .total_seconds())
+
+        if self.numpy:
+            return (self.start <= now) & (self.end >= now)
+        return [start <= now <= end for start, end in zip(self.start, self.end)]
+
+    def active(self):
+        """
+        Evaluate Lease.active for all leases at once
+        :return: numpy bool array or list of bools
+        """
+        active = self.binding_states.index('active')
+        if self.numpy:
+            return self.binding_state == active
+        return [state == active for state in self.binding_state]
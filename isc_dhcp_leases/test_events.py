@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, Lease
+from isc_dhcp_leases.events import LeaseEvents, GRANTED, RENEWED, RELEASED, EXPIRED, MOVED
+from freezegun import freeze_time
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+
+def make_lease(ip, ethernet, starts, ends, binding_state='active'):
+    return Lease(ip, {'starts': '1 2015/07/06 ' + starts, 'ends': '1 2015/07/06 ' + ends,
+                      'binding': 'state ' + binding_state, 'hardware': 'ethernet ' + ethernet})
+
+
+class TestLeaseEvents(TestCase):
+    def _events(self, events):
+        return [(event.type, event.ip) for event in events]
+
+    def test_poll_events(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/journal.leases") as source:
+            blocks = source.read().split('\n}\n')
+        blocks = [block + '\n}\n' for block in blocks]
+
+        leases = IscDhcpLeases(filename, incremental=True)
+
+        def append(*indexes):
+            with open(filename, 'a') as lease_file:
+                for index in indexes:
+                    lease_file.write(blocks[index])
+
+        append(0, 1, 2)
+        with freeze_time("2015-07-6 7:20:0"):
+            self.assertEqual(self._events(leases.poll_events()),
+                             [(GRANTED, "10.0.0.10"), (GRANTED, "10.0.0.11"), (GRANTED, "10.0.0.12")])
+            self.assertEqual(leases.poll_events(), [])
+
+            append(3)
+            events = leases.poll_events()
+            self.assertEqual(self._events(events), [(RENEWED, "10.0.0.10")])
+            self.assertEqual(events[0].previous.end_epoch + 30 * 60, events[0].lease.end_epoch)
+
+            append(4, 5, 6)
+            self.assertEqual(self._events(leases.poll_events()), [(RELEASED, "10.0.0.11"), (GRANTED, "10.0.0.13")])
+
+        with freeze_time("2015-07-6 8:20:0"):
+            self.assertEqual(self._events(leases.poll_events()), [(EXPIRED, "10.0.0.12")])
+
+        with freeze_time("2015-07-6 9:00:0"):
+            self.assertEqual(self._events(leases.poll_events()), [(EXPIRED, "10.0.0.10"), (EXPIRED, "10.0.0.13")])
+            self.assertEqual(leases.poll_events(), [])
+
+    def test_poll_events_shared_instance(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/journal.leases") as source:
+            blocks = source.read().split('\n}\n')
+        blocks = [block + '\n}\n' for block in blocks]
+
+        for kwargs in ({'incremental': True}, {'cache': True}):
+            with open(filename, 'w') as lease_file:
+                lease_file.write(''.join(blocks[:3]))
+            leases = IscDhcpLeases(filename, **kwargs)
+            with freeze_time("2015-07-6 7:20:0"):
+                # Other calls that parse the lease file before and between the polls
+                leases.get()
+                self.assertEqual(len(leases.poll_events()), 3)
+
+                with open(filename, 'a') as lease_file:
+                    lease_file.write(''.join(blocks[3:7]))
+                leases.get()
+                leases.get_current()
+                self.assertEqual(self._events(leases.poll_events()),
+                                 [(RENEWED, "10.0.0.10"), (RELEASED, "10.0.0.11"), (GRANTED, "10.0.0.13")])
+                self.assertEqual(leases.poll_events(), [])
+
+    def test_poll_events_rebuild(self):
+        # Without incremental mode every poll parses the whole lease file again
+        for kwargs in ({}, {'cache': True}):
+            leases = IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases", **kwargs)
+            with freeze_time("2015-07-6 8:40:0"):
+                self.assertEqual(self._events(leases.poll_events()),
+                                 [(GRANTED, "10.0.0.10"), (GRANTED, "10.0.0.13"), (EXPIRED, "10.0.0.10")])
+                for _ in range(10):
+                    self.assertEqual(leases.poll_events(), [])
+                self.assertEqual(len(leases._events._expiries), 1)
+
+            with freeze_time("2015-07-6 9:00:0"):
+                self.assertEqual(self._events(leases.poll_events()), [(EXPIRED, "10.0.0.13")])
+                self.assertEqual(leases.poll_events(), [])
+
+    def test_feed(self):
+        events = LeaseEvents()
+        first = make_lease("10.0.0.1", "00:00:00:00:00:aa", "07:00:00", "08:00:00")
+        self.assertEqual(self._events(events.feed([first])), [(GRANTED, "10.0.0.1")])
+        self.assertEqual(events.feed([make_lease("10.0.0.1", "00:00:00:00:00:aa", "07:00:00", "08:00:00")]), [])
+
+        moved = events.feed([make_lease("10.0.0.2", "00:00:00:00:00:aa", "07:10:00", "08:10:00")])
+        self.assertEqual(self._events(moved), [(MOVED, "10.0.0.2")])
+        self.assertEqual(moved[0].previous, first)
+
+        # dhcpd frees the lease when it expires
+        expired = events.feed([make_lease("10.0.0.2", "00:00:00:00:00:aa", "07:10:00", "08:10:00", 'free')])
+        self.assertEqual(self._events(expired), [(EXPIRED, "10.0.0.2")])
+
+        # Another client gets the address
+        taken = events.feed([make_lease("10.0.0.1", "00:00:00:00:00:bb", "07:20:00", "08:20:00")])
+        self.assertEqual(self._events(taken), [(GRANTED, "10.0.0.1")])
+
+        # The heap only reports the leases that are still the latest for their address
+        self.assertEqual(self._events(events.expire(first.end_epoch + 3600)), [(EXPIRED, "10.0.0.1")])
+        self.assertEqual(events.expire(first.end_epoch + 7200), [])
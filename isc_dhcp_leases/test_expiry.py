@@ -0,0 +1,155 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, utc
+from isc_dhcp_leases.expiry import ExpiryIndex
+from isc_dhcp_leases.index import LeaseIndex
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+
+def at(hour, minute):
+    return datetime.datetime(2015, 7, 6, hour, minute, tzinfo=utc)
+
+
+# The block dhcpd writes when the lease of 10.0.0.13 expires
+EXPIRY_BLOCK = """lease 10.0.0.13 {
+  starts 1 2015/07/06 07:45:00;
+  ends 1 2015/07/06 08:45:00;
+  tstp 1 2015/07/06 08:45:00;
+  cltt 1 2015/07/06 07:45:00;
+  binding state free;
+  hardware ethernet 00:00:00:00:00:bb;
+}
+"""
+
+
+class TestExpiryIndex(TestCase):
+    def _ips(self, leases):
+        return [lease.ip for lease in leases]
+
+    def test_queries(self):
+        index = ExpiryIndex(IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases", now=at(7, 50)))
+        self.assertEqual(len(index), 2)
+        self.assertEqual(self._ips(index.expiring_within(datetime.timedelta(minutes=45))), ["10.0.0.10"])
+        self.assertEqual(self._ips(index.expiring_within(3600)), ["10.0.0.10", "10.0.0.13"])
+        self.assertEqual(index.expiring_within(3600, now=at(9, 0)), [])
+        self.assertEqual(self._ips(index.expired_since(at(7, 0), now=at(8, 40))), ["10.0.0.10"])
+        self.assertEqual(index.expired_since(at(7, 0)), [])
+        self.assertEqual(index.next_expiry().ip, "10.0.0.10")
+        self.assertEqual(index.next_expiry(now=at(8, 31)).ip, "10.0.0.13")
+        self.assertIsNone(index.next_expiry(now=at(9, 0)))
+
+    def test_run_expired(self):
+        index = ExpiryIndex(IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases", now=at(7, 50)))
+        expired = []
+        index.on_expiry(expired.append)
+        self.assertEqual(index.run_expired(), [])
+        self.assertEqual(self._ips(index.run_expired(now=at(8, 40))), ["10.0.0.10"])
+        self.assertEqual(self._ips(index.run_expired(now=at(9, 0))), ["10.0.0.13"])
+        self.assertEqual(index.run_expired(now=at(10, 0)), [])
+        self.assertEqual(self._ips(expired), ["10.0.0.10", "10.0.0.13"])
+
+    def test_incremental_refresh(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/journal.leases") as source:
+            journal = source.read()
+        split = journal.index("lease 10.0.0.10 {", journal.index("lease 10.0.0.10 {") + 1)
+        with open(filename, 'w') as lease_file:
+            lease_file.write(journal[:split])
+
+        index = ExpiryIndex(IscDhcpLeases(filename, incremental=True, now=at(7, 50)))
+        self.assertEqual(self._ips(index.expiring_within(1800)), ["10.0.0.10", "10.0.0.11", "10.0.0.12"])
+
+        with open(filename, 'a') as lease_file:
+            lease_file.write(journal[split:])
+        index.refresh()
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.expiring_within(1800), [])
+        self.assertEqual(self._ips(index.expiring_within(3600)), ["10.0.0.10", "10.0.0.13"])
+
+    def _journal(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/journal.leases") as source:
+            journal = source.read()
+        with open(filename, 'w') as lease_file:
+            lease_file.write(journal)
+        return filename
+
+    def test_expiry_block(self):
+        filename = self._journal()
+        with open(filename, 'a') as lease_file:
+            lease_file.write(EXPIRY_BLOCK)
+
+        index = ExpiryIndex(IscDhcpLeases(filename, now=at(9, 0)))
+        self.assertEqual(len(index), 1)
+        # The released lease of 10.0.0.11 didn't expire
+        self.assertEqual(self._ips(index.expired_since(at(7, 0))), ["10.0.0.10", "10.0.0.13"])
+        self.assertEqual(index.expired_since(at(7, 0))[1].binding_state, "active")
+        self.assertEqual(self._ips(index.expired_since(at(8, 40), now=at(8, 50))), ["10.0.0.13"])
+
+        # Expired leases are dropped when they ended longer than the retention ago
+        self.assertEqual(self._ips(ExpiryIndex(IscDhcpLeases(filename, now=at(9, 0)), retention=1800)
+                                   .expired_since(at(7, 0))), ["10.0.0.10", "10.0.0.13"])
+        self.assertEqual(self._ips(ExpiryIndex(IscDhcpLeases(filename, now=at(9, 0)),
+                                               retention=datetime.timedelta(minutes=10))
+                                   .expired_since(at(7, 0))), ["10.0.0.10"])
+
+    def test_shared_instance(self):
+        filename = self._journal()
+        for kwargs in ({'incremental': True}, {'cache': True}, {}):
+            with open("isc_dhcp_leases/test_files/journal.leases") as source, open(filename, 'w') as lease_file:
+                lease_file.write(source.read())
+            leases = IscDhcpLeases(filename, now=at(8, 40), **kwargs)
+            # Other calls on the instance before the indexes are built and before they are refreshed
+            leases.get()
+            index = ExpiryIndex(leases)
+            lease_index = LeaseIndex(leases)
+            expired = []
+            index.on_expiry(expired.append)
+            self.assertEqual(len(index), 2)
+
+            with open(filename, 'a') as lease_file:
+                lease_file.write(EXPIRY_BLOCK)
+            leases.get()
+            leases.get_current()
+            lease_index.refresh()
+            index.refresh()
+            self.assertEqual(lease_index.by_ip("10.0.0.13").binding_state, "free")
+            self.assertEqual(len(index), 1)
+            self.assertEqual(self._ips(index.run_expired(now=at(9, 0))), ["10.0.0.13"])
+            self.assertEqual(self._ips(expired), ["10.0.0.13"])
+
+    def test_start(self):
+        filename = os.path.join(tempfile.mkdtemp(), 'dhcpd.leases')
+        self.addCleanup(shutil.rmtree, os.path.dirname(filename))
+        now = int(time.time())
+        with open(filename, 'w') as lease_file:
+            lease_file.write("lease 10.0.0.10 {{\n  starts epoch {};\n  ends epoch {};\n  binding state active;\n"
+                             "  hardware ethernet 00:00:00:00:00:aa;\n}}\n".format(now, now + 1))
+
+        index = ExpiryIndex(IscDhcpLeases(filename, incremental=True))
+        expired = []
+        fired = threading.Event()
+
+        def callback(lease):
+            expired.append(lease.ip)
+            # The callbacks can stop the timer
+            index.stop()
+            fired.set()
+
+        index.on_expiry(callback)
+        index.start(interval=10)
+        self.addCleanup(index.stop)
+        # The timer fires at the end of the lease without a call of run_expired()
+        self.assertTrue(fired.wait(5))
+        self.assertEqual(expired, ["10.0.0.10"])
+        self.assertIsNone(index._timer)
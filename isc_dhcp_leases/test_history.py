@@ -0,0 +1,95 @@
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, utc
+from isc_dhcp_leases.history import LeaseHistory
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+
+def at(hour, minute, second=0):
+    return datetime.datetime(2015, 7, 6, hour, minute, second, tzinfo=utc)
+
+
+class TestLeaseHistory(TestCase):
+    def setUp(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        with open("isc_dhcp_leases/test_files/journal.leases", 'rb') as source:
+            journal = source.read()
+        blocks = [block + b'\n}\n' for block in journal.split(b'\n}\n')[:-1]]
+
+        # Daily copies of the lease file, the oldest one is compressed
+        self.filenames = []
+        for day, count in enumerate([3, 5, 7]):
+            filename = os.path.join(tempdir, 'dhcpd.leases.{}'.format(day))
+            opener = gzip.open if day == 0 else open
+            with opener(filename, 'wb') as lease_file:
+                lease_file.write(b''.join(blocks[:count]))
+            self.filenames.append(filename)
+
+    def test_from_files(self):
+        results = list(IscDhcpLeases.from_files(self.filenames))
+        self.assertEqual([filename for filename, _ in results], self.filenames)
+        self.assertEqual([len(leases) for _, leases in results], [3, 5, 6])
+        self.assertEqual([len(leases) for _, leases in IscDhcpLeases.from_files(self.filenames,
+                                                                                 include_backups=True)], [3, 5, 7])
+
+        parallel = list(IscDhcpLeases.from_files(self.filenames, workers=2))
+        self.assertEqual(parallel, results)
+
+    def test_history(self):
+        for workers in (1, 2):
+            history = LeaseHistory.from_files(self.filenames, workers=workers, include_backups=True)
+            self.assertEqual(len(history), 7)
+            self.assertEqual([(entry.hostname, entry.end - entry.start) for entry in history.by_ip("10.0.0.10")],
+                             [("alpha", 3600), ("alpha", 3600)])
+            self.assertEqual([(entry.ip, entry.binding_state) for entry in history.by_client("00:00:00:00:00:BB")],
+                             [("10.0.0.11", "active"), ("10.0.0.11", "free"), ("10.0.0.13", "active")])
+            self.assertEqual([entry.binding_state for entry in history.by_ip("10.0.0.12")], ["active", "backup"])
+            self.assertEqual(history.by_ip("10.0.0.99"), [])
+
+        self.assertEqual(history.add(IscDhcpLeases(self.filenames[-1]).get()), 0)
+
+        history = LeaseHistory()
+        self.assertEqual(history.add(IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases").get()), 4)
+        entries = history.by_client("00000000000100011D344C000025906BA134")
+        self.assertEqual([entry.ip for entry in entries], ["2001:10:30:ff00::/56", "2001:10:30::1fe"])
+
+    def _holders(self, entries):
+        return [(entry.ip, entry.client, entry.start) for entry in entries]
+
+    def test_point_in_time(self):
+        history = LeaseHistory()
+        history.add(IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases").get(include_backups=True))
+        aa, bb, cc = "00:00:00:00:00:aa", "00:00:00:00:00:bb", "00:00:00:00:00:cc"
+        start = history.by_ip("10.0.0.10")[0].start
+
+        # The renewal supersedes the first lease of the address
+        self.assertEqual(self._holders(history.at(at(7, 29, 59), ip="10.0.0.10")), [("10.0.0.10", aa, start)])
+        self.assertEqual(self._holders(history.at(at(7, 30), ip="10.0.0.10")), [("10.0.0.10", aa, start + 1800)])
+
+        # Released at 7:40 before its end at 8:10
+        self.assertEqual(len(history.at(at(7, 39), ip="10.0.0.11")), 1)
+        self.assertEqual(history.at(at(7, 45), ip="10.0.0.11"), [])
+        self.assertEqual(history.at(at(7, 40), client=bb), [])
+        self.assertEqual([entry.ip for entry in history.at(at(7, 50), client=bb.upper())], ["10.0.0.13"])
+
+        # Taken over by the failover peer at 7:50
+        self.assertEqual([entry.client for entry in history.at(at(7, 20), ip="10.0.0.12")], [cc])
+        self.assertEqual(history.at(at(7, 55), ip="10.0.0.12"), [])
+
+        self.assertEqual([entry.ip for entry in history.between(at(7, 0), at(8, 0), client=bb)],
+                         ["10.0.0.11", "10.0.0.13"])
+        self.assertEqual([entry.ip for entry in history.between(start, start + 3600, client=bb)],
+                         ["10.0.0.11", "10.0.0.13"])
+        self.assertEqual(history.between(at(8, 45), at(9, 0), client=bb), [])
+        self.assertEqual(history.at(at(7, 20), ip="10.0.0.99"), [])
+        self.assertRaises(ValueError, history.at, at(7, 20))
+
+        # New blocks are indexed on the next query
+        history.add(IscDhcpLeases("isc_dhcp_leases/test_files/pfsense.leases").get())
+        self.assertEqual(len(history.at(at(8, 0), ip="10.0.0.36")), 1)
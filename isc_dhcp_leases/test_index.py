@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases
+from isc_dhcp_leases.index import LeaseIndex
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+
+class TestLeaseIndex(TestCase):
+    def test_lookups(self):
+        index = LeaseIndex(IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases"))
+        self.assertEqual(len(index), 3)
+        self.assertIn("10.0.0.10", index)
+        self.assertNotIn("10.0.0.12", index)
+        self.assertEqual(index.by_ip("10.0.0.10").hostname, "alpha")
+        self.assertIsNone(index.by_ip("10.0.0.99"))
+        self.assertEqual(sorted(lease.ip for lease in index.by_ethernet("00:00:00:00:00:BB")),
+                         ["10.0.0.11", "10.0.0.13"])
+        self.assertEqual([lease.ip for lease in index.by_hostname("Bravo")], ["10.0.0.13"])
+        self.assertEqual(index.by_ethernet("00:00:00:00:00:cc"), [])
+
+        self.assertEqual([lease.ip for lease in index.in_network("10.0.0.0/8")],
+                         ["10.0.0.10", "10.0.0.11", "10.0.0.13"])
+        self.assertEqual([lease.ip for lease in index.in_network("10.0.0.10/31")], ["10.0.0.10", "10.0.0.11"])
+        self.assertEqual([lease.ip for lease in index.in_range("10.0.0.11", "10.0.0.13")], ["10.0.0.11", "10.0.0.13"])
+        self.assertEqual(index.in_network("192.168.0.0/16"), [])
+
+        index = LeaseIndex(IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases"), include_backups=True)
+        self.assertEqual(index.by_ip("10.0.0.12").binding_state, "backup")
+        self.assertEqual(len(list(index)), 4)
+
+    def test_ipv6(self):
+        index = LeaseIndex(IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases"))
+        duid = b"\x00\x01\x00\x01\x1d4L\x00\x00%\x90k\xa14"
+        self.assertEqual(sorted(lease.ip for lease in index.by_duid(duid)),
+                         ["2001:10:30::1fe", "2001:10:30:ff00::/56"])
+        self.assertEqual(sorted(lease.ip for lease in index.by_host_identifier(b"\x00\x00\x00\x00" + duid)),
+                         ["2001:10:30::1fe", "2001:10:30:ff00::/56"])
+        self.assertEqual(len(index.by_duid(b"\x00\x01\x00\x01\x1c\xf7\x10\xa5\x00'\"3+4")), 2)
+        self.assertEqual([lease.ip for lease in index.in_network("2001:10:30::/48")],
+                         ["2001:10:30::1fe", "2001:10:30:ff00::/56"])
+        self.assertEqual(index.in_network("10.0.0.0/8"), [])
+
+    def test_prefix(self):
+        for filename in ["dhcpd6-4.3.3.leases", "dhcpd6-colon.leases"]:
+            index = LeaseIndex(IscDhcpLeases("isc_dhcp_leases/test_files/" + filename))
+            self.assertEqual(index.by_prefix("2001:10:30:ff00::1").ip, "2001:10:30:ff00::/56")
+            self.assertEqual(index.by_prefix("2001:10:30:ffab::/64").ip, "2001:10:30:ff00::/56")
+            self.assertEqual(index.by_prefix("2001:10:10:ff80::/57").ip, "2001:10:10:ff00::/56")
+            self.assertIsNone(index.by_prefix("2001:10:30:ff00::/48"))
+            self.assertIsNone(index.by_prefix("2001:10:30::1fe"))
+            self.assertIsNone(index.by_prefix("10.0.0.1"))
+
+    def test_incremental_refresh(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/journal.leases") as source:
+            journal = source.read()
+        split = journal.index("lease 10.0.0.10 {", journal.index("lease 10.0.0.10 {") + 1)
+        with open(filename, 'w') as lease_file:
+            lease_file.write(journal[:split])
+
+        index = LeaseIndex(IscDhcpLeases(filename, incremental=True))
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.by_ip("10.0.0.11").binding_state, "active")
+        self.assertEqual(index.by_hostname("charlie")[0].ip, "10.0.0.12")
+
+        with open(filename, 'a') as lease_file:
+            lease_file.write(journal[split:])
+        index.refresh()
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.by_ip("10.0.0.11").binding_state, "free")
+        self.assertEqual(index.by_hostname("charlie"), [])
+        self.assertEqual([lease.ip for lease in index.in_network("10.0.0.0/24")],
+                         ["10.0.0.10", "10.0.0.11", "10.0.0.13"])
+
+        replacement = os.path.join(tempdir, 'dhcpd.leases.new')
+        shutil.copy("isc_dhcp_leases/test_files/pfsense.leases", replacement)
+        os.rename(replacement, filename)
+        index.refresh()
+        self.assertEqual(len(index), 2)
+        self.assertEqual([lease.ip for lease in index.in_network("10.0.0.0/16")], ["10.0.0.36", "10.0.10.72"])
+
+    def test_shared_instance(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/journal.leases") as source:
+            journal = source.read()
+        split = journal.index("lease 10.0.0.10 {", journal.index("lease 10.0.0.10 {") + 1)
+
+        for kwargs in ({'incremental': True}, {'cache': True}):
+            with open(filename, 'w') as lease_file:
+                lease_file.write(journal[:split])
+            leases = IscDhcpLeases(filename, **kwargs)
+            # Other calls on the instance before the index is built and before it is refreshed
+            leases.get()
+            index = LeaseIndex(leases)
+            other = LeaseIndex(leases)
+            self.assertEqual((len(index), len(other)), (3, 3))
+
+            with open(filename, 'a') as lease_file:
+                lease_file.write(journal[split:])
+            leases.get()
+            leases.get_current()
+            for lease_index in (index, other):
+                lease_index.refresh()
+                self.assertEqual(dict((lease.ip, lease) for lease in lease_index), leases.get_latest())
+                self.assertEqual(lease_index.by_ip("10.0.0.11").binding_state, "free")
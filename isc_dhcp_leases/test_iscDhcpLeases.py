@@ -1,6 +1,13 @@
 import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import threading
 from unittest import TestCase
-from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, Lease, Lease6, utc
+from isc_dhcp_leases import iscdhcpleases
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, Lease, Lease6, LazyLease, LazyLease6, utc, _split_points, \
+    _iter_mapped_chunks, bz2, lzma, _open_zstd
 from freezegun import freeze_time
 
 __author__ = 'Martijn Braam <martijn@brixit.nl>'
@@ -258,3 +265,360 @@ class TestIscDhcpLeases(TestCase):
     def test_naive_time(self):
         with self.assertRaises(ValueError):
             IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases", now=datetime.datetime.now())
+
+    def test_incremental(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        shutil.copy("isc_dhcp_leases/test_files/debian7.leases", filename)
+
+        leases = IscDhcpLeases(filename, incremental=True)
+        self.assertEqual(len(leases.get()), 5)
+        self.assertEqual(len(leases.get(include_backups=True)), 6)
+
+        with open("isc_dhcp_leases/test_files/pfsense.leases") as source:
+            appended = source.read()
+        with open(filename, 'a') as lease_file:
+            # The second block isn't complete yet
+            lease_file.write('\n' + appended[:-20])
+        result = leases.get()
+        self.assertEqual(len(result), 6)
+        self.assertEqual(result[5].ip, "10.0.10.72")
+
+        with open(filename, 'a') as lease_file:
+            lease_file.write(appended[-20:])
+        result = leases.get()
+        self.assertEqual(len(result), 7)
+        self.assertEqual(result[6].ip, "10.0.0.36")
+        self.assertEqual(result[6].hostname, "Gebruiker-PC")
+
+        # dhcpd rewrites the lease file to a new file and renames it over the old one
+        replacement = os.path.join(tempdir, 'dhcpd.leases.new')
+        shutil.copy("isc_dhcp_leases/test_files/pfsense.leases", replacement)
+        os.rename(replacement, filename)
+        result = leases.get()
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0].ip, "10.0.10.72")
+        self.assertEqual(result, IscDhcpLeases(filename).get())
+
+    def test_compressed(self):
+        expected = IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases").get()
+        for extension, module in [("gz", gzip), ("bz2", bz2), ("xz", lzma), ("zst", _open_zstd)]:
+            if module is None:
+                continue
+            leases = IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases." + extension)
+            self.assertEqual(leases.get(), expected)
+            self.assertEqual(list(leases.iter_leases(chunk_size=64)), expected)
+            self.assertEqual(list(leases.get_latest().values()), expected)
+
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        shutil.copy("isc_dhcp_leases/test_files/debian7.leases.gz", filename)
+        leases = IscDhcpLeases(filename, incremental=True)
+        self.assertEqual(leases.get(), expected)
+        self.assertEqual(leases.get(), expected)
+
+        with open(filename, 'wb') as lease_file:
+            lease_file.write(b'\x28\xb5\x2f\xfd')
+        # Without the module for the format
+        self.addCleanup(setattr, iscdhcpleases, '_compressions', iscdhcpleases._compressions)
+        iscdhcpleases._compressions = [(b'\x28\xb5\x2f\xfd', None)]
+        self.assertRaises(ValueError, IscDhcpLeases(filename).get)
+
+    @freeze_time("2015-07-6 8:15:0")
+    def test_incremental_get_current(self):
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/pfsense.leases", incremental=True)
+        self.assertEqual(len(leases.get_current()), 2)
+        self.assertEqual(len(leases.get_current()), 2)
+
+    def test_iter_leases(self):
+        for filename, gzipped in [("isc_dhcp_leases/test_files/debian7.leases", False),
+                                  ("isc_dhcp_leases/test_files/debian7.leases.gz", True),
+                                  ("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases", False)]:
+            leases = IscDhcpLeases(filename, gzipped)
+            expected = leases.get(include_backups=True)
+            for chunk_size in (1, 7, 64, 1024 * 1024):
+                result = list(leases.iter_leases(include_backups=True, chunk_size=chunk_size))
+                self.assertEqual(result, expected)
+                self.assertEqual([lease.data for lease in result], [lease.data for lease in expected])
+
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases")
+        iterator = leases.iter_leases(chunk_size=64)
+        self.assertEqual(next(iterator).ip, "10.0.0.10")
+        self.assertEqual(len(list(iterator)), 4)
+
+    def test_other_blocks(self):
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/failover.leases")
+        result = leases.get(include_backups=True)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].ip, "10.0.0.20")
+        self.assertEqual(result[0].ethernet, "00:0c:29:bf:4a:90")
+        self.assertEqual(result[0].hostname, "workstation")
+        self.assertEqual(result[0].binding_state, "active")
+        # Statements in nested blocks are part of the lease
+        self.assertEqual(result[0].sets, {'clientip': '10.0.0.20'})
+
+        # The last nested block wins, IPv6 leases used to stop at the end of the first one ("===EXPIRY===")
+        result = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases").get()
+        self.assertEqual(result[0].data['log'], '(debug, "===RELEASE===")')
+        self.assertEqual(result[0].sets, dict(iana='2001:10:10:0:0:0:0:106', clientduid='0100011cf710a5002722332b34'))
+
+    @freeze_time("2015-08-18 17:0:0")
+    def test_lazy(self):
+        v4_attributes = ['ip', 'data', 'options', 'sets', 'binding_state', 'start', 'end', 'hardware', 'ethernet',
+                         'hostname', 'valid', 'active']
+        v6_attributes = ['ip', 'data', 'options', 'sets', 'binding_state', 'type', 'last_communication',
+                         'host_identifier', 'iaid', 'duid', 'end', 'preferred_life', 'max_life', 'valid', 'active']
+        for filename in ["debian7.leases", "pfsense.leases", "options.leases", "static.leases", "epoch.leases",
+                         "dhcpd6-4.2.4.leases", "dhcpd6-4.3.3.leases"]:
+            filename = "isc_dhcp_leases/test_files/" + filename
+            expected = IscDhcpLeases(filename).get(include_backups=True)
+            result = IscDhcpLeases(filename, lazy=True).get(include_backups=True)
+            self.assertEqual(len(result), len(expected))
+            for lease, expected_lease in zip(result, expected):
+                if isinstance(expected_lease, Lease6):
+                    self.assertIsInstance(lease, LazyLease6)
+                    attributes = v6_attributes
+                else:
+                    self.assertIsInstance(lease, LazyLease)
+                    attributes = v4_attributes
+                for attribute in attributes:
+                    self.assertEqual(getattr(lease, attribute), getattr(expected_lease, attribute), attribute)
+                self.assertEqual(repr(lease), repr(expected_lease))
+
+        self.assertEqual(len(IscDhcpLeases("isc_dhcp_leases/test_files/backup.leases", lazy=True).get()), 1)
+        self.assertEqual(len(IscDhcpLeases("isc_dhcp_leases/test_files/pfsense.leases", lazy=True).get_current()), 0)
+
+    def test_lazy_deferred(self):
+        lease = IscDhcpLeases("isc_dhcp_leases/test_files/pfsense.leases", lazy=True).get()[0]
+        self.assertEqual(lease.ethernet, "64:5a:04:6a:07:a2")
+
+        # object.__getattribute__ doesn't fall back to __getattr__ for attributes that aren't set
+        with self.assertRaises(AttributeError):
+            object.__getattribute__(lease, 'start')
+        with self.assertRaises(AttributeError):
+            object.__getattribute__(lease, 'hostname')
+        self.assertEqual(lease.start, datetime.datetime(2015, 7, 6, 7, 50, 42, tzinfo=utc))
+        self.assertEqual(object.__getattribute__(lease, 'start'), lease.start)
+
+        lease.end = None
+        self.assertIsNone(lease.end)
+        with self.assertRaises(AttributeError):
+            lease.missing
+
+    def test_interned_strings(self):
+        result = IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases").get()
+        self.assertIs(result[0].binding_state, result[1].binding_state)
+        self.assertIs(result[0].hardware, result[1].hardware)
+        self.assertIs(list(result[0].data)[0], list(result[1].data)[0])
+        with self.assertRaises(AttributeError):
+            result[0].undefined_attribute = True
+
+    def test_get_current_matches_get(self):
+        for now in [datetime.datetime(2015, 7, 6, 8, 15, 0, tzinfo=utc),
+                    datetime.datetime(2015, 8, 18, 17, 0, 0, tzinfo=utc),
+                    datetime.datetime(2016, 1, 6, 15, 0, 0, tzinfo=utc)]:
+            for filename in ["debian7.leases", "pfsense.leases", "options.leases", "failover.leases",
+                             "dhcpd6-4.2.4.leases", "dhcpd6-4.3.3.leases"]:
+                filename = "isc_dhcp_leases/test_files/" + filename
+                expected = {}
+                for lease in IscDhcpLeases(filename, now=now).get():
+                    if lease.valid and lease.active:
+                        key = lease.ethernet if isinstance(lease, Lease) else \
+                            '%s-%s' % (lease.type, lease.host_identifier_string)
+                        expected[key] = lease
+
+                for kwargs in [{}, {'lazy': True}, {'incremental': True}]:
+                    result = IscDhcpLeases(filename, now=now, **kwargs).get_current()
+                    self.assertEqual(result, expected)
+
+    def test_split_points(self):
+        lease_data = b"lease 1 {\n  a;\n}\nlease 2 {\n  b;\n}\nlease 3 {\n  c;\n}"
+        self.assertEqual(_split_points(lease_data, 1), [0, len(lease_data)])
+        points = _split_points(lease_data, 3)
+        self.assertEqual(points, [0, 33, len(lease_data)])
+        for start, end in zip(points[1:], points[2:]):
+            self.assertTrue(lease_data[start:end].startswith(b"\nlease"))
+        self.assertEqual(_split_points(lease_data, 50), [0, 16, 33, len(lease_data)])
+
+    def test_parallel(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open(filename, 'w') as lease_file:
+            for _ in range(20):
+                for name in ["debian7.leases", "pfsense.leases", "dhcpd6-4.3.3.leases", "epoch.leases"]:
+                    with open("isc_dhcp_leases/test_files/" + name) as source:
+                        lease_file.write(source.read() + "\n")
+
+        expected = IscDhcpLeases(filename).get(include_backups=True)
+        for kwargs in [{}, {'lazy': True}]:
+            result = IscDhcpLeases(filename, workers=3, **kwargs).get(include_backups=True)
+            self.assertEqual(len(result), len(expected))
+            self.assertEqual([(lease.ip, lease.data) for lease in result],
+                             [(lease.ip, lease.data) for lease in expected])
+        self.assertEqual(len(IscDhcpLeases(filename, workers=3).get()), len(IscDhcpLeases(filename).get()))
+
+        open(filename, 'w').close()
+        self.assertEqual(IscDhcpLeases(filename, workers=3).get(), [])
+
+    def test_iter_mapped_chunks(self):
+        lease_data = b"lease 1 {\n  a;\n}\nlease 2 {\n  b;\n}\nlease 3 {\n  c;"
+        self.assertEqual(list(_iter_mapped_chunks(lease_data, 0, 1024)), [(lease_data[:33].decode(), 33)])
+        self.assertEqual(list(_iter_mapped_chunks(lease_data, 0, 1)),
+                         [(lease_data[:16].decode(), 16), (lease_data[16:33].decode(), 33)])
+        self.assertEqual(list(_iter_mapped_chunks(lease_data, 16, 1)), [(lease_data[16:33].decode(), 33)])
+        self.assertEqual(list(_iter_mapped_chunks(lease_data, 33, 1)), [])
+
+    def test_get_latest(self):
+        for kwargs in [{}, {'lazy': True}, {'incremental': True}]:
+            leases = IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases", **kwargs)
+            result = leases.get_latest()
+            self.assertEqual(sorted(result), ["10.0.0.10", "10.0.0.11", "10.0.0.13"])
+            self.assertEqual(result["10.0.0.10"].start, datetime.datetime(2015, 7, 6, 7, 30, 0, tzinfo=utc))
+            self.assertEqual(result["10.0.0.11"].binding_state, "free")
+            self.assertEqual(result["10.0.0.13"].ethernet, "00:00:00:00:00:bb")
+
+            result = leases.get_latest(include_backups=True)
+            self.assertEqual(len(result), 4)
+            self.assertEqual(result["10.0.0.12"].binding_state, "backup")
+
+        result = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases").get_latest()
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result["2001:10:30:ff00::/56"].type, Lease6.PREFIX_DELEGATION)
+
+    def test_cache(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        shutil.copy("isc_dhcp_leases/test_files/debian7.leases", filename)
+
+        leases = IscDhcpLeases(filename, cache=True)
+        result = leases.get()
+        self.assertEqual(len(result), 5)
+        self.assertIs(leases.get()[0], result[0])
+        self.assertEqual(len(leases.get(include_backups=True)), 6)
+        self.assertIs(leases.get_latest()["10.0.0.10"], result[0])
+
+        with open(filename, 'a') as lease_file:
+            with open("isc_dhcp_leases/test_files/pfsense.leases") as source:
+                lease_file.write('\n' + source.read())
+        refreshed = leases.get()
+        self.assertEqual(len(refreshed), 7)
+        self.assertIsNot(refreshed[0], result[0])
+        self.assertEqual(refreshed[0], result[0])
+
+        leases.invalidate()
+        self.assertIsNot(leases.get()[0], refreshed[0])
+
+        leases = IscDhcpLeases(filename, cache=True, cache_ttl=0)
+        self.assertIsNot(leases.get()[0], leases.get()[0])
+
+    def test_cache_get_current(self):
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/pfsense.leases", cache=True)
+        with freeze_time("2015-07-6 8:15:0"):
+            self.assertEqual(len(leases.get_current()), 2)
+        with freeze_time("2015-07-6 8:30:0"):
+            # The leases are cached but their validity is checked again
+            self.assertEqual(list(leases.get_current()), ["14:da:e9:04:c8:a3"])
+
+    def test_cache_threads(self):
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases", cache=True,
+                               now=datetime.datetime(2016, 1, 6, 15, 0, 0, tzinfo=utc))
+        expected = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases",
+                                 now=datetime.datetime(2016, 1, 6, 15, 0, 0, tzinfo=utc)).get_current()
+        results = []
+
+        def worker():
+            for _ in range(20):
+                results.append(leases.get_current())
+                leases.invalidate()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 80)
+        for result in results:
+            self.assertEqual(result, expected)
+
+    def test_where(self):
+        start = datetime.datetime(2014, 1, 1, tzinfo=utc)
+        end = datetime.datetime(2015, 7, 6, 8, 30, tzinfo=utc)
+        predicates = [
+            ({'binding_state': 'active'}, lambda lease: lease.binding_state == 'active'),
+            ({'binding_state': ['free', 'abandoned']}, lambda lease: lease.binding_state in ('free', 'abandoned')),
+            ({'network': '10.0.0.0/28'}, lambda lease: lease.ip.startswith('10.0.0.') and
+                int(lease.ip.split('.')[3]) < 16),
+            ({'network': '2001:10:30::/48'}, lambda lease: lease.ip.startswith('2001:10:30:')),
+            ({'ip': ['10.0.0.10', '10.0.10.72']}, lambda lease: lease.ip in ('10.0.0.10', '10.0.10.72')),
+            ({'ethernet': ['60:A4:4C', '14:da']}, lambda lease: getattr(lease, 'ethernet', None) is not None and
+                lease.ethernet.startswith(('60:a4:4c', '14:da'))),
+            ({'hardware': 'ethernet', 'start_after': start},
+             lambda lease: getattr(lease, 'hardware', None) == 'ethernet' and lease.start >= start),
+            ({'end_before': end}, lambda lease: lease.end is not None and lease.end <= end),
+            ({'end_after': end}, lambda lease: lease.end is None or lease.end >= end),
+        ]
+        for filename in ["debian7.leases", "pfsense.leases", "options.leases", "static.leases", "backup.leases",
+                         "dhcpd6-4.3.3.leases"]:
+            filename = "isc_dhcp_leases/test_files/" + filename
+            for include_backups in (False, True):
+                expected = IscDhcpLeases(filename).get(include_backups)
+                for where, check in predicates:
+                    matches = [lease for lease in expected if check(lease)]
+                    for kwargs in ({}, {'lazy': True}, {'incremental': True}):
+                        leases = IscDhcpLeases(filename, **kwargs)
+                        self.assertEqual(leases.get(include_backups, where=where), matches)
+
+        self.assertRaises(ValueError, IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases").get,
+                          where={'mac': '60:a4:4c'})
+
+    def test_fields(self):
+        for filename in ["debian7.leases", "options.leases", "epoch.leases", "dhcpd6-4.3.3.leases"]:
+            filename = "isc_dhcp_leases/test_files/" + filename
+            expected = IscDhcpLeases(filename, now=datetime.datetime(2015, 7, 6, tzinfo=utc)).get()
+            if isinstance(expected[0], Lease6):
+                fields = ['ip', 'host_identifier_string', 'end', 'preferred_life', 'valid', 'options']
+            else:
+                fields = ['ip', 'ethernet', 'hostname', 'start_epoch', 'valid', 'active']
+            for incremental in (False, True):
+                leases = IscDhcpLeases(filename, now=datetime.datetime(2015, 7, 6, tzinfo=utc),
+                                       incremental=incremental)
+                result = leases.get(fields=fields)
+                self.assertEqual([tuple(record) for record in result],
+                                 [tuple(getattr(lease, field) for field in fields) for lease in expected])
+                self.assertEqual(result[0].ip, expected[0].ip)
+
+        result = IscDhcpLeases("isc_dhcp_leases/test_files/pfsense.leases").get(
+            fields=['ethernet'], where={'ip': '10.0.10.72'})
+        self.assertEqual([record.ethernet for record in result], ["64:5a:04:6a:07:a2"])
+
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases")
+        self.assertEqual(leases.get(fields=['ethernet'])[0].ethernet, None)
+        self.assertRaises(ValueError, leases.get, fields=['mac'])
+
+    def test_colon_hex_identifiers(self):
+        expected = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases").get()
+        for kwargs in ({}, {'lazy': True}, {'incremental': True}):
+            leases = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-colon.leases", **kwargs)
+            result = leases.get()
+            self.assertEqual([(lease.ip, lease.type, lease.host_identifier, lease.iaid, lease.duid) for lease in result],
+                             [(lease.ip, lease.type, lease.host_identifier, lease.iaid, lease.duid)
+                              for lease in expected])
+            self.assertEqual(sorted(leases.get_current()), sorted(IscDhcpLeases(
+                "isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases").get_current()))
+
+        # The quotes decide the format, not the characters of the identifier
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/dhcpd6-colon.leases") as source:
+            lease_data = source.read()
+        with open(filename, 'w') as lease_file:
+            lease_file.write(lease_data.replace('ia-na 01:00:00:00:00:01:00:01:1c:f7:10:a5:00:27:22:33:2b:34 {',
+                                                'ia-na "01:00:00:00:00:01" {'))
+        for kwargs in ({}, {'lazy': True}):
+            lease = IscDhcpLeases(filename, **kwargs).get()[0]
+            self.assertEqual((lease.host_identifier, lease.duid), (b"01:00:00:00:00:01", b"0:00:00:00:01"))
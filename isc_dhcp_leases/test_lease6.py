@@ -1,6 +1,6 @@
 import datetime
 from unittest import TestCase
-from isc_dhcp_leases.iscdhcpleases import Lease6, utc
+from isc_dhcp_leases.iscdhcpleases import Lease6, parse_host_identifier, utc
 from freezegun import freeze_time
 
 __author__ = 'Martijn Braam <martijn@brixit.nl>'
@@ -77,3 +77,22 @@ class TestLease6(TestCase):
             Lease6("2001:610:600:891d::60", self.lease_data, self.lease_time,
                    "4dv\\352\\000\\001\\000\\001\\035f\\037\\342\\012\\000'\\000\\000\\000", "na",
                    now=datetime.datetime.now())
+
+    def test_parse_host_identifier(self):
+        self.assertEqual(parse_host_identifier("4dv\\352\\000\\001\\0\\12'\\\"\\\\"),
+                         b"4dv\xea\x00\x01\x00\n'\"\\")
+        self.assertEqual(parse_host_identifier("\\0012"), b"\x012")
+        self.assertEqual(parse_host_identifier("01:00:00:00:00:01:00:01:1c:f7", quoted=False),
+                         b"\x01\x00\x00\x00\x00\x01\x00\x01\x1c\xf7")
+        self.assertEqual(parse_host_identifier("1:0:a:ff", False), b"\x01\x00\x0a\xff")
+        # A quoted identifier that looks like the colon separated hex format
+        self.assertEqual(parse_host_identifier("ab:cd:ef"), b"ab:cd:ef")
+        self.assertEqual(parse_host_identifier("ab:cd:ef", False), b"\xab\xcd\xef")
+        self.assertIs(parse_host_identifier("\\001\\000\\000\\000"),
+                      parse_host_identifier("\\001\\000\\000\\000"))
+
+        lease = Lease6("2001:610:600:891d::60", self.lease_data, self.lease_time,
+                       "34:64:76:ea:00:01:00:01:1d:66:1f:e2:0a:00:27:00:00:00", "na", quoted=False)
+        self.assertEqual(lease.host_identifier, b"4dv\xea\x00\x01\x00\x01\x1df\x1f\xe2\n\x00'\x00\x00\x00")
+        self.assertEqual(lease.iaid, 3933627444)
+        self.assertEqual(lease.host_identifier_string, "346476ea000100011d661fe20a0027000000")
@@ -0,0 +1,40 @@
+import datetime
+from unittest import TestCase
+from isc_dhcp_leases.iscdhcpleases import Lease, Lease6, parse_time, parse_time_epoch, utc
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+
+class TestParseTime(TestCase):
+    def test_parse_time(self):
+        self.assertEqual(parse_time('2 2013/12/10 12:57:04'), datetime.datetime(2013, 12, 10, 12, 57, 4, tzinfo=utc))
+        self.assertEqual(parse_time('epoch 1507216949; # Thu Oct 05 15:22:29 2017'),
+                         datetime.datetime(2017, 10, 5, 15, 22, 29, tzinfo=utc))
+        self.assertEqual(parse_time('epoch 1507216949'), datetime.datetime(2017, 10, 5, 15, 22, 29, tzinfo=utc))
+        self.assertEqual(parse_time('1 2015/1/5 8:01:09'), datetime.datetime(2015, 1, 5, 8, 1, 9, tzinfo=utc))
+
+    def test_parse_time_epoch(self):
+        for value in ['2 2013/12/10 12:57:04', '4 2017/10/05 15:22:29', '0 1999/12/31 23:59:59',
+                      '3 2038/01/20 03:14:08', '1 2015/1/5 8:01:09']:
+            expected = datetime.datetime.strptime(value, "%w %Y/%m/%d %H:%M:%S").replace(tzinfo=utc)
+            self.assertEqual(parse_time_epoch(value),
+                             (expected - datetime.datetime(1970, 1, 1, tzinfo=utc)).total_seconds())
+        self.assertEqual(parse_time_epoch('epoch 1507216949; # Thu Oct 05 15:22:29 2017'), 1507216949)
+
+    def test_cache(self):
+        value = '2 2013/12/10 12:57:04'
+        self.assertIs(parse_time(value), parse_time(value))
+
+    def test_epoch_attributes(self):
+        lease = Lease("192.168.0.1", {'starts': '2 2013/12/10 12:57:04', 'ends': '2 2013/12/10 13:07:04',
+                                      'binding': 'state free'})
+        self.assertEqual(lease.start_epoch, 1386680224)
+        self.assertEqual(lease.end_epoch, 1386680824)
+        lease.end = None
+        self.assertIsNone(lease.end_epoch)
+
+        lease = Lease6("2001:610:600:891d::60", {'binding': 'state active', 'ends': 'epoch 1386680824;',
+                                                 'preferred-life': '375', 'max-life': '600'},
+                       parse_time('2 2013/12/10 12:57:04'), "4dv\\352\\000", "na")
+        self.assertEqual(lease.end_epoch, 1386680824)
+        self.assertEqual(lease.last_communication_epoch, 1386680224)
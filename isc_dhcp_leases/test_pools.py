@@ -0,0 +1,45 @@
+from unittest import TestCase
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases
+from isc_dhcp_leases.pools import PoolCounter, Pool, parse_pool, read_dhcpd_conf
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+
+class TestPools(TestCase):
+    def test_read_dhcpd_conf(self):
+        pools = read_dhcpd_conf("isc_dhcp_leases/test_files/dhcpd.conf")
+        self.assertEqual(pools, [
+            Pool("10.0.0.10-10.0.0.11", "10.0.0.10", "10.0.0.11", 2),
+            Pool("10.0.0.12-10.0.0.20", "10.0.0.12", "10.0.0.20", 9),
+            Pool("192.168.0.100", "192.168.0.100", "192.168.0.100", 1),
+            Pool("2001:10:10::100-2001:10:10::1ff", "2001:10:10::100", "2001:10:10::1ff", 256),
+            Pool("2001:10:10:ff00::-2001:10:10:ffff::/64", "2001:10:10:ff00::", "2001:10:10:ffff::", 256),
+            Pool("2001:10:30::/64", "2001:10:30::", "2001:10:30:0:ffff:ffff:ffff:ffff", 2 ** 64),
+        ])
+
+    def test_parse_pool(self):
+        self.assertEqual(parse_pool("10.0.0.0/24"), Pool("10.0.0.0/24", "10.0.0.0", "10.0.0.255", 256))
+        self.assertEqual(parse_pool("10.0.0.10 - 10.0.0.100"),
+                         Pool("10.0.0.10 - 10.0.0.100", "10.0.0.10", "10.0.0.100", 91))
+
+    def test_count(self):
+        counter = PoolCounter.from_dhcpd_conf("isc_dhcp_leases/test_files/dhcpd.conf")
+        for incremental in (False, True):
+            leases = IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases", incremental=incremental)
+            self.assertEqual([usage.counts for usage in counter.count(leases)][:3],
+                             [{'active': 1, 'free': 1}, {'active': 1, 'backup': 1}, {}])
+
+            leases = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases", incremental=incremental)
+            self.assertEqual([usage.counts for usage in counter.count(leases)][3:],
+                             [{'active': 1}, {'active': 1}, {'active': 1}])
+
+        counter = PoolCounter(["10.0.0.0/29", "10.0.0.8/29", "10.0.1.0/24"])
+        self.assertEqual(counter.lookup("10.0.0.7"), 0)
+        self.assertEqual(counter.lookup("10.0.0.8"), 1)
+        self.assertIsNone(counter.lookup("10.0.0.16"))
+        self.assertIsNone(counter.lookup("9.255.255.255"))
+        self.assertIsNone(counter.lookup("2001:10:10::106"))
+        usage = counter.count(IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases"))
+        self.assertEqual([(pool.name, counts) for pool, counts in usage],
+                         [("10.0.0.0/29", {}), ("10.0.0.8/29", {'active': 2, 'free': 1, 'backup': 1}),
+                          ("10.0.1.0/24", {})])
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from isc_dhcp_leases.iscdhcpleases import BaseLease, IscDhcpLeases, Lease6
+from isc_dhcp_leases.snapshot import LeaseSnapshot
+from isc_dhcp_leases.table import mac_to_int
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+TEST_FILES = ["debian7.leases", "pfsense.leases", "options.leases", "static.leases", "epoch.leases",
+              "backup.leases", "failover.leases", "dhcpd6-4.2.4.leases", "dhcpd6-4.3.3.leases",
+              "dhcpd6-colon.leases"]
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        self.snapshot = os.path.join(self.tempdir, 'leases.snapshot')
+
+    def assertLeasesEqual(self, result, expected):
+        self.assertEqual(result, expected)
+        for lease, other in zip(result, expected):
+            self.assertEqual((lease.data, lease.options, lease.sets, lease.binding_state, lease.end),
+                             (other.data, other.options, other.sets, other.binding_state, other.end))
+            if isinstance(other, Lease6):
+                self.assertEqual((lease.type, lease.last_communication, lease.iaid, lease.duid),
+                                 (other.type, other.last_communication, other.iaid, other.duid))
+            else:
+                self.assertEqual((lease.hostname, lease.start), (other.hostname, other.start))
+
+    def test_round_trip(self):
+        for filename in TEST_FILES:
+            filename = "isc_dhcp_leases/test_files/" + filename
+            expected = IscDhcpLeases(filename).get(include_backups=True)
+            for lazy_source in (False, True):
+                leases = IscDhcpLeases(filename, incremental=True, lazy=lazy_source)
+                leases.save_snapshot(self.snapshot)
+                for lazy in (False, True):
+                    restored = IscDhcpLeases(filename, incremental=True, lazy=lazy)
+                    self.assertTrue(restored.load_snapshot(self.snapshot))
+                    self.assertLeasesEqual(restored.get(include_backups=True), expected)
+
+    def test_resume(self):
+        filename = os.path.join(self.tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/journal.leases") as source:
+            journal = source.read()
+        split = journal.index("lease 10.0.0.10 {", journal.index("lease 10.0.0.10 {") + 1)
+        with open(filename, 'w') as lease_file:
+            lease_file.write(journal[:split])
+        IscDhcpLeases(filename, incremental=True).save_snapshot(self.snapshot)
+
+        with open(filename, 'a') as lease_file:
+            lease_file.write(journal[split:])
+        leases = IscDhcpLeases(filename, incremental=True)
+        self.assertTrue(leases.load_snapshot(self.snapshot))
+        restored = list(leases._leases)
+        self.assertEqual(len(restored), 3)
+        # The binding state and the times come from the records, the statements aren't parsed
+        self.assertEqual([(lease.binding_state, lease.start_epoch, lease.end_epoch) for lease in restored],
+                         [("active", 1436166000, 1436169600), ("active", 1436166600, 1436170200),
+                          ("active", 1436166900, 1436170500)])
+        for lease in restored:
+            self.assertRaises(AttributeError, BaseLease.data.__get__, lease, type(lease))
+
+        result = leases.get(include_backups=True)
+        self.assertLeasesEqual(result, IscDhcpLeases(filename).get(include_backups=True))
+        for lease, loaded in zip(result, restored):
+            self.assertIs(lease, loaded)
+
+        # The lease file has been rewritten since the snapshot
+        replacement = os.path.join(self.tempdir, 'dhcpd.leases.new')
+        shutil.copy("isc_dhcp_leases/test_files/pfsense.leases", replacement)
+        os.rename(replacement, filename)
+        leases = IscDhcpLeases(filename, incremental=True)
+        self.assertFalse(leases.load_snapshot(self.snapshot))
+        self.assertEqual(len(leases.get()), 2)
+
+    def test_reader(self):
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases", incremental=True)
+        leases.save_snapshot(self.snapshot)
+        with LeaseSnapshot(self.snapshot) as snapshot:
+            self.assertEqual(len(snapshot), 6)
+            self.assertEqual(snapshot.offset, os.stat("isc_dhcp_leases/test_files/debian7.leases").st_size)
+            record = snapshot.record(0)
+            lease = leases.get(include_backups=True)[0]
+            self.assertEqual(record.ip, lease.ip)
+            self.assertEqual(record.mac, mac_to_int(lease.ethernet))
+            self.assertEqual((record.start, record.end), (lease.start_epoch, lease.end_epoch))
+            self.assertEqual(record.binding_state, "free")
+            self.assertRaises(IndexError, snapshot.record, 6)
+
+        with open(self.snapshot, 'wb') as snapshot_file:
+            snapshot_file.write(b'\0' * 64)
+        self.assertRaises(ValueError, LeaseSnapshot, self.snapshot)
+        self.assertRaises(ValueError, IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases").save_snapshot,
+                          self.snapshot)
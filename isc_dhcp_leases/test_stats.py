@@ -0,0 +1,99 @@
+import datetime
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, utc
+from isc_dhcp_leases.stats import STAGES, ParseStats
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+
+class TestParseStats(TestCase):
+    def test_counters(self):
+        stats = ParseStats()
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases", stats=stats)
+        self.assertIs(leases.stats, stats)
+        self.assertEqual(len(leases.get()), 5)
+        self.assertEqual(stats.bytes_read, os.path.getsize("isc_dhcp_leases/test_files/debian7.leases"))
+        self.assertEqual(stats.chunks, 1)
+        self.assertEqual(stats.blocks, {'lease': 6})
+        self.assertEqual(stats.skipped, {'no hardware': 1})
+        self.assertEqual((stats.leases, stats.malformed_lines), (5, 0))
+        self.assertEqual(sorted(stats.timings), sorted(STAGES))
+        self.assertTrue(all(seconds > 0 for seconds in stats.timings.values()))
+
+        # The counters add up over parses until they are reset
+        leases.get(include_backups=True)
+        self.assertEqual((stats.blocks, stats.leases, stats.skipped), ({'lease': 12}, 11, {'no hardware': 1}))
+        stats.reset()
+        self.assertEqual((stats.bytes_read, stats.blocks, stats.timings['read']), (0, {}, 0.0))
+
+        stats = ParseStats()
+        IscDhcpLeases("isc_dhcp_leases/test_files/failover.leases", stats=stats).get()
+        self.assertEqual(stats.blocks, {'failover': 1, 'host': 1, 'lease': 1})
+
+        stats = ParseStats()
+        IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases", stats=stats).get()
+        self.assertEqual(stats.blocks, {'ia-na': 2, 'ia-pd': 2})
+
+        # Lazy leases parse their properties on first access
+        stats = ParseStats()
+        IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases", lazy=True, stats=stats).get()
+        self.assertEqual((stats.leases, stats.skipped), (5, {'no hardware': 1}))
+        self.assertEqual((stats.timings['properties'], stats.timings['times']), (0.0, 0.0))
+
+    def test_skipped(self):
+        stats = ParseStats()
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases", stats=stats)
+        self.assertEqual(len(leases.get_latest(include_backups=True)), 4)
+        self.assertEqual(stats.skipped, {'superseded': 3})
+
+        stats.reset()
+        self.assertEqual(len(leases.get(where={'binding_state': 'free'})), 1)
+        self.assertEqual(stats.skipped, {'where': 6})
+
+        stats.reset()
+        self.assertEqual(len(leases.get(fields=['ip'], where={'binding_state': 'free'})), 1)
+        self.assertEqual((stats.leases, stats.skipped), (1, {'where': 5, 'no hardware': 1}))
+
+        stats = ParseStats()
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/journal.leases", stats=stats,
+                               now=datetime.datetime(2015, 7, 6, 7, 20, tzinfo=utc))
+        self.assertEqual(len(leases.get_current()), 3)
+        self.assertEqual(stats.skipped, {'not current': 3, 'no hardware': 1})
+
+    def test_malformed_lines(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/debian7.leases") as source:
+            lease_data = source.read()
+        with open(filename, 'w') as lease_file:
+            lease_data = lease_data.replace("tstp 2 2013/12/10 13:07:04;", "tstp 2 2013/12/10 13:07:04", 1)
+            lease_file.write(lease_data.replace("}\nlease 10.0.0.15 {", "}\ntruncated statement\n# comment\n"
+                                                "authoring-byte-order little-endian;\nlease 10.0.0.15 {"))
+
+        stats = ParseStats()
+        leases = IscDhcpLeases(filename, stats=stats).get()
+        self.assertNotIn('tstp', leases[0].data)
+        self.assertEqual(stats.malformed_lines, 2)
+
+    def test_workers(self):
+        stats = ParseStats()
+        files = ["isc_dhcp_leases/test_files/debian7.leases", "isc_dhcp_leases/test_files/pfsense.leases"]
+        results = list(IscDhcpLeases.from_files(files, workers=2, stats=stats))
+        self.assertEqual([len(leases) for _, leases in results], [5, 2])
+        self.assertEqual(stats.leases, 7)
+        self.assertEqual(stats.bytes_read, sum(os.path.getsize(filename) for filename in files))
+
+        stats = ParseStats()
+        leases = IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases.gz", workers=2, stats=stats).get()
+        self.assertEqual(len(leases), 5)
+        self.assertEqual(stats.bytes_read, os.path.getsize("isc_dhcp_leases/test_files/debian7.leases"))
+
+        other = ParseStats()
+        other.add(stats)
+        other.add(stats)
+        self.assertEqual((other.leases, other.blocks), (10, {'lease': 12}))
+        self.assertEqual(other.timings['read'], 2 * stats.timings['read'])
@@ -0,0 +1,94 @@
+import datetime
+from unittest import TestCase, skipIf
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, Lease6, utc
+from isc_dhcp_leases import table as table_module
+from isc_dhcp_leases.table import LeaseTable, MISSING, NEVER, ip_to_int, mac_to_int, int_to_mac, numpy
+from freezegun import freeze_time
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+TEST_FILES = ["debian7.leases", "pfsense.leases", "options.leases", "static.leases", "epoch.leases",
+              "backup.leases", "dhcpd6-4.2.4.leases", "dhcpd6-4.3.3.leases"]
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=utc)
+
+
+class TestLeaseTable(TestCase):
+    def test_conversions(self):
+        self.assertEqual(ip_to_int("10.0.0.10"), (4, 0x0a00000a, 32))
+        self.assertEqual(ip_to_int("2001:10:30:ff00::/56"), (6, 0x2001001000 << 88 | 0x30ff00 << 64, 56))
+        self.assertEqual(mac_to_int("60:a4:4c:b5:6a:dd"), 0x60a44cb56add)
+        self.assertEqual(mac_to_int(None), 0)
+        self.assertEqual(int_to_mac(0x60a44cb56add), "60:a4:4c:b5:6a:dd")
+
+    def test_to_table(self):
+        for filename in TEST_FILES:
+            leases = IscDhcpLeases("isc_dhcp_leases/test_files/" + filename)
+            expected = leases.get(include_backups=True)
+            table = leases.to_table(include_backups=True)
+            self.assertEqual(len(table), len(expected))
+
+            for index, lease in enumerate(expected):
+                self.assertEqual(table.ip_string(index), lease.ip)
+                self.assertEqual(table.binding_states[table.binding_state[index]], lease.binding_state)
+                end = NEVER if lease.end is None else int((lease.end - EPOCH).total_seconds())
+                self.assertEqual(table.end[index], end)
+                if isinstance(lease, Lease6):
+                    self.assertEqual(table.family[index], 6)
+                    self.assertEqual(table.mac[index], 0)
+                    self.assertEqual(table.start[index], MISSING)
+                    self.assertEqual(table.cltt[index],
+                                     int((lease.last_communication - EPOCH).total_seconds()))
+                else:
+                    self.assertEqual(table.family[index], 4)
+                    self.assertEqual(table.mac[index], mac_to_int(lease.ethernet))
+                    self.assertEqual(table.hostname(index), lease.hostname)
+                    start = MISSING if lease.start is None else int((lease.start - EPOCH).total_seconds())
+                    self.assertEqual(table.start[index], start)
+
+        table = IscDhcpLeases("isc_dhcp_leases/test_files/backup.leases").to_table()
+        self.assertEqual(len(table), 1)
+
+    def _test_valid(self, numpy_columns):
+        now = datetime.datetime(2015, 7, 6, 8, 15, 0, tzinfo=utc)
+        for filename in TEST_FILES:
+            leases = IscDhcpLeases("isc_dhcp_leases/test_files/" + filename, now=now)
+            table = leases.to_table(include_backups=True, numpy=numpy_columns)
+            expected = leases.get(include_backups=True)
+            self.assertEqual(list(table.valid(now)), [lease.valid for lease in expected])
+            self.assertEqual(list(table.active()), [lease.active for lease in expected])
+
+        with freeze_time("2015-07-6 8:15:0"):
+            table = IscDhcpLeases("isc_dhcp_leases/test_files/pfsense.leases").to_table(numpy=numpy_columns)
+            self.assertEqual(list(table.valid()), [True, True])
+
+    def test_valid(self):
+        self._test_valid(False)
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_valid_numpy(self):
+        self._test_valid(True)
+        table = IscDhcpLeases("isc_dhcp_leases/test_files/debian7.leases").to_table(numpy=True)
+        self.assertIsInstance(table.mac, numpy.ndarray)
+        self.assertEqual(table.mac.dtype, numpy.uint64)
+        self.assertEqual(table.start.dtype, numpy.int64)
+        self.assertEqual(table.hostname(0), "")
+
+    def test_unknown_binding_state(self):
+        table = LeaseTable()
+        table.append("10.0.0.1", None, None, None, None, "something-new", "host")
+        table.finish()
+        self.assertEqual(table.binding_states[table.binding_state[0]], "something-new")
+        self.assertEqual(table.hostname(0), "host")
+
+    def test_list_columns(self):
+        # Python 2 doesn't have the 64 bit array typecodes
+        self.addCleanup(setattr, table_module, '_has_64_bit', table_module._has_64_bit)
+        table_module._has_64_bit = False
+        self.test_to_table()
+        self._test_valid(False)
+        table = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases").to_table()
+        self.assertIsInstance(table.ip6_high, list)
+        if numpy is not None:
+            table = IscDhcpLeases("isc_dhcp_leases/test_files/dhcpd6-4.3.3.leases").to_table(numpy=True)
+            self.assertEqual((table.ip6_high.dtype, table.end.dtype), (numpy.uint64, numpy.int64))
+            self._test_valid(True)
@@ -0,0 +1,108 @@
+import datetime
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipIf
+from isc_dhcp_leases.iscdhcpleases import IscDhcpLeases, utc
+from isc_dhcp_leases.events import GRANTED, RENEWED, RELEASED, EXPIRED, MOVED
+
+try:
+    import asyncio
+    from isc_dhcp_leases.watcher import LeaseWatcher, _inotify_init1
+except (ImportError, SyntaxError):
+    # Python 2.7
+    LeaseWatcher = None
+
+__author__ = 'Martijn Braam <martijn@brixit.nl>'
+
+
+@skipIf(LeaseWatcher is None, "the watcher needs asyncio")
+class TestLeaseWatcher(TestCase):
+    def setUp(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        self.filename = os.path.join(tempdir, 'dhcpd.leases')
+        with open("isc_dhcp_leases/test_files/journal.leases") as source:
+            self.blocks = [block + '\n}\n' for block in source.read().split('\n}\n')]
+
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def append(self, *indexes):
+        with open(self.filename, 'a') as lease_file:
+            for index in indexes:
+                lease_file.write(self.blocks[index])
+
+    def rewrite(self, *indexes):
+        # Like dhcpd, write a new file and rename it over the lease file
+        with open(self.filename + '~', 'w') as lease_file:
+            for index in indexes:
+                lease_file.write(self.blocks[index])
+        os.rename(self.filename + '~', self.filename)
+
+    def next_events(self, watcher, change=None):
+        if change is not None:
+            self.loop.call_later(0.05, change)
+        events = self.loop.run_until_complete(asyncio.wait_for(watcher.__anext__(), 5))
+        return [(event.type, event.ip) for event in events]
+
+    def _test_watcher(self, inotify):
+        self.append(0, 1, 2)
+        now = datetime.datetime(2015, 7, 6, 7, 20, 0, tzinfo=utc)
+        leases = IscDhcpLeases(self.filename, incremental=True, now=now)
+        watcher = LeaseWatcher(leases, debounce=0.01, poll_interval=0.02, inotify=inotify)
+        self.addCleanup(watcher.close)
+
+        self.assertEqual(self.next_events(watcher),
+                         [(GRANTED, "10.0.0.10"), (GRANTED, "10.0.0.11"), (GRANTED, "10.0.0.12")])
+        self.assertEqual(self.next_events(watcher, lambda: self.append(3)), [(RENEWED, "10.0.0.10")])
+        self.assertEqual(self.next_events(watcher, lambda: self.append(4, 5)),
+                         [(RELEASED, "10.0.0.11"), (GRANTED, "10.0.0.13")])
+        self.assertEqual(self.next_events(watcher, lambda: self.rewrite(3, 1)), [(MOVED, "10.0.0.11")])
+        return watcher
+
+    @skipIf(LeaseWatcher is None or _inotify_init1 is None, "inotify is not available")
+    def test_inotify(self):
+        watcher = self._test_watcher(True)
+        self.assertIsNotNone(watcher._inotify)
+
+    def test_polling(self):
+        watcher = self._test_watcher(False)
+        self.assertIsNone(watcher._inotify)
+
+    def test_shared_instance(self):
+        self.append(0, 1, 2)
+        now = datetime.datetime(2015, 7, 6, 7, 20, 0, tzinfo=utc)
+        leases = IscDhcpLeases(self.filename, incremental=True, now=now)
+        watcher = LeaseWatcher(leases, debounce=0.01, poll_interval=0.02, inotify=False)
+        self.addCleanup(watcher.close)
+        self.assertEqual(len(self.next_events(watcher)), 3)
+
+        def change(*indexes):
+            # Another user of the instance parses the appended blocks before the watcher sees them
+            self.append(*indexes)
+            leases.get_current()
+
+        self.assertEqual(self.next_events(watcher, lambda: change(3)), [(RENEWED, "10.0.0.10")])
+        leases.get_current()
+        self.assertEqual(self.next_events(watcher, lambda: change(4, 5)),
+                         [(RELEASED, "10.0.0.11"), (GRANTED, "10.0.0.13")])
+
+    def test_rebuild(self):
+        # Without incremental mode every poll parses the whole lease file, the unchanged leases don't
+        # cause events again
+        self.append(0, 1, 2, 3, 4, 5, 6)
+        now = datetime.datetime(2015, 7, 6, 8, 40, 0, tzinfo=utc)
+        watcher = LeaseWatcher(IscDhcpLeases(self.filename, now=now), debounce=0.01, poll_interval=0.02,
+                               inotify=False)
+        self.addCleanup(watcher.close)
+
+        self.assertEqual(self.next_events(watcher),
+                         [(GRANTED, "10.0.0.10"), (GRANTED, "10.0.0.13"), (EXPIRED, "10.0.0.10")])
+        renewal = self.blocks[5].replace("ends 1 2015/07/06 08:45:00", "ends 1 2015/07/06 09:45:00")
+
+        def renew():
+            with open(self.filename, 'a') as lease_file:
+                lease_file.write(renewal)
+
+        self.assertEqual(self.next_events(watcher, renew), [(RENEWED, "10.0.0.13")])
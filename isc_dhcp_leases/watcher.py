@@ -0,0 +1,182 @@
+"""
+asyncio watcher for lease files, only available on Python 3.5 and later
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import time
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# The directory is watched so the rename of dhcpd's rewritten lease file over the old one is seen
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event without the name that follows it
+_inotify_event = struct.Struct('iIII')
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+    _inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+except (OSError, AttributeError, TypeError):
+    # Not on Linux, fall back to polling the file. On Windows find_library() returns None for the C library,
+    # which CDLL() rejects with a TypeError
+    _inotify_init1 = None
+
+
+class _Inotify(object):
+    """
+    inotify instance watching the directory of a file
+    """
+
+    def __init__(self, filename):
+        directory, name = os.path.split(os.path.abspath(filename))
+        self.name = os.fsencode(name)
+        self.fd = _inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        if _inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), directory)
+
+    def read(self):
+        """
+        Read the pending events
+        :return: True if one of the events was about the watched file
+        """
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+
+        changed = False
+        offset = 0
+        while offset + _inotify_event.size <= len(data):
+            _, mask, _, length = _inotify_event.unpack_from(data, offset)
+            offset += _inotify_event.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW or name == self.name:
+                changed = True
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LeaseWatcher(object):
+    """
+    Async iterator of the changes in a lease file. Every iteration returns a non-empty list of
+    LeaseEvent tuples, the first iteration returns a GRANTED event for every active lease.
+
+    The watcher wakes on writes to the lease file and when dhcpd renames a rewritten lease file over
+    it, using inotify on Linux and by polling the file every poll_interval seconds elsewhere. It also
+    wakes when the next active lease expires. Bursts of writes are collected until the file has been
+    quiet for debounce seconds, for at most ten times the debounce, and then parsed with
+    IscDhcpLeases.poll_events() in an executor so the event loop isn't blocked. Create the
+    IscDhcpLeases instance with incremental=True to only parse the appended blocks, otherwise the
+    whole lease file is parsed for every change.
+    """
+
+    def __init__(self, leases, debounce=0.05, poll_interval=1.0, executor=None, inotify=True):
+        """
+        :param leases: IscDhcpLeases instance
+        :param debounce: seconds without writes before the lease file is parsed
+        :param poll_interval: seconds between checks of the lease file when inotify isn't used
+        :param executor: concurrent.futures executor to parse in, the default executor of the loop if None
+        :param inotify: use inotify when it is available
+        """
+        self.leases = leases
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.executor = executor
+        self.inotify = inotify and _inotify_init1 is not None
+
+        self._loop = None
+        self._changed = None
+        self._inotify = None
+
+    def _start(self):
+        self._loop = asyncio.get_event_loop()
+        self._changed = asyncio.Event()
+        # Parse the current leases on the first iteration
+        self._changed.set()
+        if self.inotify:
+            try:
+                self._inotify = _Inotify(self.leases.filename)
+            except OSError:
+                # E.g. the limit on inotify instances is reached
+                self._inotify = None
+            else:
+                self._loop.add_reader(self._inotify.fd, self._read_inotify)
+
+    def _read_inotify(self):
+        if self._inotify.read():
+            self._changed.set()
+
+    def close(self):
+        """
+        Stop watching the lease file
+        """
+        if self._inotify is not None:
+            self._loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+
+    def _timeout(self):
+        """
+        :return: seconds until the watcher has to check the lease file without a notification or None
+        """
+        timeout = None
+        next_expiry = self.leases._events.next_expiry()
+        # With a fixed time in IscDhcpLeases.now leases never expire while waiting
+        if next_expiry is not None and self.leases.now is None:
+            timeout = max(next_expiry - time.time(), 0) + 0.001
+        if self._inotify is None:
+            timeout = self.poll_interval if timeout is None else min(timeout, self.poll_interval)
+        return timeout
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._changed.wait(), self._timeout())
+        except asyncio.TimeoutError:
+            return
+
+        for _ in range(10):
+            self._changed.clear()
+            await asyncio.sleep(self.debounce)
+            if not self._changed.is_set():
+                break
+        self._changed.clear()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._loop is None:
+            self._start()
+        while True:
+            await self._wait()
+            events = await self._loop.run_in_executor(self.executor, self.leases.poll_events)
+            if events:
+                return events
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()